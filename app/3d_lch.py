@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
+import ingest
+import wheel
 
 # Function to convert L*a*b to LCH
 def lab_to_lch(row):
@@ -45,11 +47,12 @@ if st.sidebar.button("Add value"):
 data_file = st.sidebar.file_uploader("Load in the CSV file...", type='csv')
 
 if data_file is not None:
-    df = pd.read_csv(data_file)
-    if 'L' in df.columns and 'a' in df.columns and 'b' in df.columns:
-        df[['L', 'C', 'H']] = df.apply(lab_to_lch, axis=1, result_type='expand')
-    else:
-        st.error("CSV must contain 'L', 'a', and 'b' columns for Lab color space.")
+    try:
+        # Read Lab or LCH columns and convert to LCH column-wise
+        df = ingest.read_colour_csv(data_file)
+    except ValueError as e:
+        st.error(str(e))
+        df = pd.DataFrame()
 else:
     df = pd.DataFrame(st.session_state.data_list)
 
@@ -62,7 +65,10 @@ if not df.empty:
         st.markdown("---")
         opacity = st.slider('Select chart background opacity', 0.0, 1.0, 1.0)
 
-        fig = px.scatter_polar(df, r="C", theta="H", text="Toner", height=600,
+        # LCH files may not carry a Toner label column
+        text_col = "Toner" if "Toner" in df.columns else None
+
+        fig = px.scatter_polar(df, r="C", theta="H", text=text_col, height=600,
                                 hover_data=df.columns, range_r=[0, 130],
                                 direction='counterclockwise', start_angle=-23)
 
@@ -73,18 +79,11 @@ if not df.empty:
             legend=dict(orientation="v", yanchor="bottom", y=1.02, xanchor="center", x=1),
             polar=dict(radialaxis=dict(showticklabels=show_scale, visible=show_scale)),
             hoverlabel=dict(bgcolor="white", font_size=16, font_family="Rockwell"),
-            images=[dict(
-                source="https://iili.io/JUVtZog.png",
-                xref="paper", yref="paper",
-                x=0.503, y=0.503,
-                sizex=1.0, sizey=1.13,
-                xanchor="center", yanchor="middle",
-                sizing="contain", layer="below"
-            )],
+            # Hue wheel drawn from the LCH maths, cached and sent inline
+            images=[wheel.wheel_image(opacity=opacity)],
             margin=dict(l=50, r=50, t=50, b=50)
         )
 
-        fig.update_layout_images(opacity=opacity)
         fig.update_traces(marker=dict(size=10), textposition='top left')
 
         # Plot chart on screen
@@ -5,6 +5,8 @@ import plotly.graph_objects as go
 import numpy as np
 from PIL import Image  # Import Image module from PIL library
 import plot_3d as lcm  # Ensure this module is available in your environment
+import ingest
+import wheel
 
 
 # Function to convert L*a*b to LCH
@@ -46,12 +48,12 @@ if st.sidebar.button("Add value"):
 data_file = st.sidebar.file_uploader("Load in the CSV file...")
 
 if data_file is not None:
-    df = pd.read_csv(data_file)
-    if 'L' in df.columns and 'a' in df.columns and 'b' in df.columns:
-        # Convert Lab values to LCH
-        df[['L', 'C', 'H']] = df.apply(lab_to_lch, axis=1, result_type='expand')
-    else:
-        st.error("CSV must contain 'L', 'a', and 'b' columns for Lab color space.")
+    try:
+        # Read Lab or LCH columns and convert to LCH column-wise
+        df = ingest.read_colour_csv(data_file)
+    except ValueError as e:
+        st.error(str(e))
+        df = pd.DataFrame()
 else:
     # If no file uploaded yet, use accumulated data
     df = pd.DataFrame(st.session_state.data_list)
@@ -71,12 +73,15 @@ if not show_3d:
             # Add a slider to control the background image opacity 
             opacity = st.slider('Select chart background opacity', 0.0, 1.0, 1.0) 
 
+            # LCH files may not carry a Toner label column
+            text_col = "Toner" if "Toner" in df.columns else None
+
             # Check if "source" column is present in the DataFrame
             if "Source" in df.columns:
-                fig = px.scatter_polar(df, r="C", theta="H", color="Source", direction='counterclockwise', start_angle=-23, text="Toner", height=600,
+                fig = px.scatter_polar(df, r="C", theta="H", color="Source", direction='counterclockwise', start_angle=-23, text=text_col, height=600,
                                        hover_data=df.columns, range_r=[0, 130])
             else:
-                fig = px.scatter_polar(df, r="C", theta="H", direction='counterclockwise', start_angle=-23, text="Toner", height=600,
+                fig = px.scatter_polar(df, r="C", theta="H", direction='counterclockwise', start_angle=-23, text=text_col, height=600,
                                        hover_data=df.columns, range_r=[0, 130])
             
             fig.update_layout( 
@@ -93,21 +98,12 @@ if not show_3d:
                     radialaxis=dict(showticklabels=show_scale, visible=show_scale)
                 ),
                 hoverlabel=dict(bgcolor="white", font_size=16, font_family="Rockwell"),
-                images=[dict(
-                    source="https://iili.io/JUVtZog.png",
-                    xref="paper", yref="paper",
-                    x=0.503, y=0.503,
-                    sizex=1.0, sizey=1.13,
-                    xanchor="center",
-                    yanchor="middle",
-                    sizing="contain",
-                    layer="below"
-                )],
+                # Hue wheel drawn from the LCH maths, cached and sent inline
+                images=[wheel.wheel_image(opacity=opacity)],
                 margin=dict(l=50, r=50, t=50, b=50)
             )
 
             # Update the image and grid
-            fig.update_layout_images(opacity=opacity)
             fig.update_traces(marker=dict(size=10))
             fig.update_traces(textposition='top left')  # Adjust marker size as needed
         
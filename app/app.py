@@ -1,10 +1,19 @@
 import streamlit as st 
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
-from PIL import Image  # Import Image module from PIL library
-import plot_3d as lcm  # Ensure this module is available in your environment
+import ingest
+import wheel
+import cached
+import lod
+import figures
+import session_store
+import neighbours
+import lch_convert
+import delta_e
+import export
+import instrument
+import monitor
+import library
 
 
 # Function to convert L*a*b to LCH
@@ -15,6 +24,13 @@ def lab_to_lch(row):
     h_deg = np.degrees(h_rad) % 360
     return L, C, h_deg
 
+# st.fragment is st.experimental_fragment before Streamlit 1.37
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+# Time each pipeline stage of this run when diagnostics are switched on
+if st.session_state.get("diagnostics"):
+    instrument.start()
+
 st.title("Plot LCH or Lab values")
 
 # Sidebar - capture L, C, H and insert into dataframe
@@ -34,27 +50,211 @@ else:
     H = st.sidebar.number_input("Enter H value", value=180.00)
     ref = st.sidebar.text_input("Enter reference ")
 
-# Button to add LCH values into a list
-if 'data_list' not in st.session_state:
-    st.session_state.data_list = []
+# Lab of the colour entered above, used as the reference for Delta E
+if colour_space == "Lab":
+    target = (L, a, b)
+else:
+    target = tuple(lch_convert.lch_to_lab_array(L_value, C, H))
+
+# Button to add LCH values into the session store
+if 'store' not in st.session_state:
+    st.session_state.store = session_store.ColourStore()
+store = st.session_state.store
 
 if st.sidebar.button("Add value"):
-    st.session_state.data_list.append({'L': L_value, 'C': C, 'H': H, "Toner": ref})
+    store.append(L_value, C, H, ref)
     st.sidebar.success(f"Added: L={L_value}, C={C}, H={H}, Ref={ref}")
 
+# Paste a block of readings in the selected colour space
+with st.sidebar.expander("Paste readings"):
+    pasted = st.text_area(f"One per line: three {colour_space} values and a reference")
+    if st.button("Add pasted readings") and pasted.strip():
+        try:
+            rows = ingest.parse_pasted(pasted, colour_space)
+            store.extend(rows['L'], rows['C'], rows['H'], rows['Toner'])
+            st.success(f"Added {len(rows)} readings")
+        except ValueError as e:
+            st.error(f"Could not read pasted values: {e}")
+
+if st.sidebar.button("Undo last add", disabled=len(store) == 0):
+    store.undo()
+
 # Load CSV of data points
-data_file = st.sidebar.file_uploader("Load in the CSV file...")
+data_file = st.sidebar.file_uploader("Load in a CSV, Parquet or Arrow file...")
+
+# Large files can be read in chunks, keeping only a sample for plotting
+streaming = st.sidebar.checkbox("Stream large files", value=False)
+if streaming:
+    max_points = st.sidebar.number_input("Max points to plot", min_value=1000, value=20000, step=1000)
 
+# Readings kept in a colour library on disk, selected by reference name prefix
+use_library = st.sidebar.checkbox("Use colour library", value=False)
+if use_library:
+    library_path = st.sidebar.text_input("Library folder", value=library.DEFAULT_PATH)
+    toner_prefix = st.sidebar.text_input("Toner starts with")
+    source_prefix = st.sidebar.text_input("Source starts with")
+    library_stamp = library.stamp(library_path)
+    if library_stamp is None and data_file is None:
+        st.sidebar.info("No colour library in this folder yet; load a file and add it to start one.")
+
+overlay = None
+conversion = None
+sampled = False
 if data_file is not None:
-    df = pd.read_csv(data_file)
-    if 'L' in df.columns and 'a' in df.columns and 'b' in df.columns:
-        # Convert Lab values to LCH
-        df[['L', 'C', 'H']] = df.apply(lab_to_lch, axis=1, result_type='expand')
-    else:
-        st.error("CSV must contain 'L', 'a', and 'b' columns for Lab color space.")
+    # Parsed uploads are shared by content hash across sessions, so neither widget
+    # changes nor other users loading the same file re-read it
+    data = data_file.getvalue()
+    with instrument.timer("hash_upload"):
+        data_key = cached.content_hash(data)
+    try:
+        if streaming and ingest.colour_format_of(data_file.name) == "csv":
+            cached.cancel_conversion()
+            df, stats = cached.stream_colour_csv(data_key, data, int(max_points))
+            data_key = f"{data_key}:{int(max_points)}"
+            sampled = True
+            st.sidebar.caption(f"Plotting {len(df):,} of {stats['count']:,} readings")
+            with st.expander("Summary of all readings"):
+                st.dataframe(ingest.summarise_stats(stats))
+        else:
+            # Read Lab or LCH columns and convert to LCH column-wise on a worker
+            # thread, drawing the chunks converted so far until it finishes
+            df, conversion = cached.convert_in_background(data_key, data, data_file.name)
+            if conversion is not None:
+                data_key = f"{data_key}:partial{len(df)}"
+    except ValueError as e:
+        st.error(str(e))
+        df = pd.DataFrame()
+        data_key = None
+    base_key = data_key
+    # Readings added in this session are drawn on top of the shared file
+    overlay = store.frame()
+    if use_library and data_key is not None and not sampled and conversion is None:
+        if st.sidebar.button("Add file to library"):
+            try:
+                with st.spinner("Adding to library..."):
+                    added = library.ColourLibrary.open(library_path, create=True).append(df)
+                st.sidebar.success(f"Library now holds {len(added):,} readings")
+            except TimeoutError as e:
+                st.sidebar.error(str(e))
+elif use_library and library_stamp is not None:
+    cached.cancel_conversion()
+    cached.release_session_dataset()
+    # The library is memory-mapped, so only the selected rows are read
+    colour_library = cached.colour_library(library_path, library_stamp)
+    with instrument.timer("library_select"):
+        df = colour_library.frame(colour_library.select(Toner=toner_prefix, Source=source_prefix))
+    data_key = f"library:{library_path}:{library_stamp}:{toner_prefix!r}:{source_prefix!r}"
+    base_key = data_key
+    st.sidebar.caption(f"Plotting {len(df):,} of {len(colour_library):,} library readings")
+    overlay = store.frame()
 else:
+    cached.cancel_conversion()
+    cached.release_session_dataset()
     # If no file uploaded yet, use accumulated data
-    df = pd.DataFrame(st.session_state.data_list)
+    df = store.frame()
+    data_key = store.key
+    # Unchanged while points are only appended, so kept figures can be extended
+    base_key = store.append_key
+
+# Progress of a background conversion; the whole app reruns once it finishes
+if conversion is not None:
+    @fragment(run_every=0.5)
+    def conversion_progress():
+        job = st.session_state.get("conversion")
+        if job is None or job.done:
+            st.rerun()
+        if not job.started:
+            st.progress(0.0, text=f"Waiting for a free worker to convert {data_file.name}")
+        else:
+            st.progress(job.progress, text=f"Converting {data_file.name}: {job.rows:,} readings so far")
+
+    conversion_progress()
+
+# Save the current readings as Parquet, with any added over a loaded file; load
+# the file back through the uploader
+if overlay is None or overlay.empty:
+    saved_key, saved_overlay = data_key, None
+else:
+    saved_key, saved_overlay = f"{data_key}+{store.key}", overlay
+if not df.empty or saved_overlay is not None:
+    st.sidebar.download_button("Download as Parquet", cached.parquet_bytes(saved_key, df, saved_overlay),
+                               file_name="lch_session.parquet", mime="application/octet-stream")
+
+# Nearest readings to the colour entered above
+if not df.empty:
+    with st.sidebar.expander("Find nearest"):
+        metric = st.radio("Delta E", ["CIE76", "CIEDE2000"], horizontal=True)
+        k = st.number_input("Matches", min_value=1, max_value=100, value=5)
+        st.caption(f"Target L={target[0]:.2f}, a={target[1]:.2f}, b={target[2]:.2f}")
+        index = cached.colour_index(data_key, df)
+        st.dataframe(neighbours.nearest_colours(df, target, k=int(k), metric=metric, index=index),
+                     hide_index=True)
+
+# Compare every reading with the entered colour, highlighting or keeping only
+# those within tolerance
+tolerance_key = None
+if not df.empty:
+    with st.sidebar.expander("Tolerance"):
+        tolerance_mode = st.radio("Tolerance mode", ["Off", "Highlight", "Filter"], horizontal=True)
+        tolerance_metric = st.selectbox("Formula", list(delta_e.METRICS), index=2)
+        tolerance = st.number_input("Tolerance (Delta E)", min_value=0.0, value=2.0, step=0.5)
+    if tolerance_mode != "Off":
+        tolerance_key = (tolerance_mode, tolerance_metric, target, tolerance)
+        with instrument.timer("delta_e"):
+            dE = cached.delta_e_to_target(data_key, df, target, tolerance_metric)
+        within = dE <= tolerance
+        df = df.assign(dE=dE)
+        if tolerance_mode == "Filter":
+            df = df[within]
+            data_key = f"{data_key}:{tolerance_metric}:{target}:{tolerance}"
+            base_key = f"{base_key}:{tolerance_metric}:{target}:{tolerance}"
+            st.sidebar.caption(f"{len(df):,} readings within Delta E {tolerance:g}")
+        else:
+            df['Tolerance'] = np.where(within, f"Within {tolerance:g}", "Outside")
+
+# Flag readings outside the sRGB gamut, whose plotted colours are clamped
+if not df.empty:
+    with instrument.timer("gamut_flags"):
+        in_srgb = cached.gamut_flags(data_key, df)
+    df = df.assign(**{"In sRGB": in_srgb})
+    n_outside = int((~in_srgb).sum())
+    if n_outside:
+        st.warning(f"{n_outside:,} of {len(df):,} readings are outside the sRGB gamut "
+                   "and are drawn with clamped colours.")
+show_gamut = st.sidebar.checkbox("Show sRGB gamut boundary", value=False)
+
+# Static chart images for reports, rendered on the server and cached on disk
+# by dataset and view
+if not df.empty and conversion is None:
+    with st.sidebar.expander("Export image"):
+        export_view = st.radio("View", export.VIEWS, horizontal=True)
+        export_format = st.radio("Format", export.FORMATS, horizontal=True)
+        if st.button("Render image"):
+            # The polar chart's wheel as on screen; its widgets are further down,
+            # so their values are read from the session state
+            wheel_params = {'L': L_value if st.session_state.get("wheel_at_entered_L") else wheel.DEFAULT_L,
+                            'opacity': st.session_state.get("wheel_opacity", 1.0)}
+            with st.spinner("Rendering..."), instrument.timer("export_image"):
+                image = export.render_cached(data_key, df, export_view, export_format,
+                                             **(wheel_params if export_view == "polar" else {}))
+            st.session_state.export_image = (data_key, export_view, export_format, image)
+        image = st.session_state.get("export_image")
+        if image is not None and image[:3] == (data_key, export_view, export_format):
+            st.download_button("Download image", image[3], file_name=f"lch_{export_view}.{export_format}",
+                               mime="image/svg+xml" if export_format == "svg" else "image/png")
+
+# Figures are kept between reruns and only rebuilt when their data changes
+if 'figures' not in st.session_state:
+    st.session_state.figures = figures.FigureCache()
+
+# Rows after the figure's own data go on as one "Added" trace: readings appended
+# to the session store, or this session's readings over a shared file
+if overlay is None:
+    rows, base_rows, overlay_key = len(df), None, None
+    added_rows = lambda start: df.iloc[start:]
+else:
+    rows, base_rows, overlay_key = len(df) + len(overlay), len(df), store.key
+    added_rows = lambda start: overlay.iloc[start - len(df):]
 
 # Checkbox to toggle the scale
 show_scale = st.sidebar.checkbox("Show Scale", value=False)
@@ -62,6 +262,98 @@ show_scale = st.sidebar.checkbox("Show Scale", value=False)
 # Checkbox to toggle the flip to 3D scale
 show_3d = st.sidebar.checkbox("Show in 3D", value=False)
 
+# Optionally colour 3D markers from the interpolated lookup table
+if show_3d:
+    lut_colours = st.sidebar.checkbox("Lookup-table colours", value=False)
+
+# Density mode: counts per C/H bin (or L/C/H voxel in 3D) instead of readings
+density = st.sidebar.checkbox("Density", value=False)
+if density:
+    c_step = st.sidebar.number_input("Bin size: Chroma", min_value=0.5, value=5.0, step=0.5)
+    h_step = st.sidebar.number_input("Bin size: Hue (degrees)", min_value=1.0, max_value=90.0,
+                                     value=5.0 if not show_3d else 10.0, step=1.0)
+    if show_3d:
+        l_step = st.sidebar.number_input("Bin size: Lightness", min_value=0.5, value=5.0, step=0.5)
+        density_key = ("density", c_step, h_step, l_step)
+    else:
+        l_band = st.sidebar.slider("Lightness band", 0.0, 100.0, (0.0, 100.0))
+        density_key = ("density", c_step, h_step, l_band)
+
+# Per-group summaries: centroids and covariance ellipses over, or instead of,
+# the readings
+group_key = None
+summary_only = False
+group_columns = [col for col in ("Source", "Toner") if col in df.columns]
+group_by = st.sidebar.selectbox("Group summary", ["Off"] + group_columns) if group_columns else "Off"
+if group_by != "Off" and not df.empty:
+    summary_only = st.sidebar.checkbox("Summary only", value=True)
+    sigma = st.sidebar.number_input("Ellipse size (standard deviations)", min_value=0.5, max_value=4.0,
+                                    value=2.0, step=0.5)
+    with instrument.timer("group_stats"):
+        group_stats = cached.group_stats(data_key, df, group_by)
+    with st.expander(f"{group_by} statistics ({len(group_stats):,} groups)"):
+        st.dataframe(group_stats, hide_index=True)
+    group_key = (group_by, summary_only, sigma)
+# Views that draw aggregates (including group overlays over the readings) are
+# rebuilt as rows arrive; only session readings over a shared file go on as a
+# separate trace
+aggregated = density or summary_only or group_key is not None
+
+# Level of detail for the polar chart: bin large datasets, raw points when zoomed in
+use_lod = not density and not summary_only and st.sidebar.checkbox("Level of detail", value=True)
+if use_lod:
+    budget_kb = st.sidebar.number_input("Chart payload budget (KB)", min_value=100,
+                                        value=lod.DEFAULT_BUDGET_BYTES // 1000, step=100)
+    c_range = st.sidebar.slider("Zoom: Chroma range", 0.0, 130.0, (0.0, 130.0))
+    h_range = st.sidebar.slider("Zoom: Hue range", 0.0, 360.0, (0.0, 360.0))
+
+# Live monitoring: follow a growing CSV or a local socket feed. New rows go into
+# a ring buffer and per-toner running statistics, and the live chart refreshes
+# on its own at no more than the chosen rate.
+monitoring = st.sidebar.checkbox("Monitor live readings", value=False)
+if monitoring:
+    feed_source = st.sidebar.text_input("Feed: CSV path or host:port")
+    max_fps = st.sidebar.slider("Max refreshes per second", 0.2, 5.0, 1.0, step=0.2)
+    drift_metric = st.sidebar.selectbox("Drift formula", list(delta_e.METRICS), index=2)
+
+    live = st.session_state.get("monitor")
+    if live is not None and (live[0] != feed_source or not feed_source):
+        live[1].close()
+        live = st.session_state.monitor = None
+    if live is None and feed_source:
+        try:
+            live = st.session_state.monitor = (feed_source, monitor.Monitor(monitor.open_feed(feed_source)))
+        except OSError as e:
+            st.error(f"Could not open feed: {e}")
+
+    @fragment(run_every=1 / max_fps)
+    def live_view():
+        mon = st.session_state.monitor[1]
+        try:
+            mon.poll()
+        except (OSError, ValueError) as e:
+            st.error(f"Error reading feed: {e}")
+        st.caption(f"{mon.received:,} readings received, latest {len(mon.buffer):,} plotted")
+        if len(mon.buffer) == 0:
+            return
+        # Rebuilt only when new readings have arrived
+        fig, note = st.session_state.figures.get(
+            "live", (id(mon), mon.version), len(mon.buffer),
+            lambda: figures.lod_polar(mon.frame(), "Toner"), base_rows=len(mon.buffer))
+        if note:
+            st.caption(note)
+        fig.update_layout(images=[wheel.wheel_image()])
+        st.plotly_chart(fig, key="live_polar")
+        st.dataframe(mon.drift(drift_metric), hide_index=True)
+
+    if st.session_state.get("monitor") is not None:
+        st.subheader("Live readings")
+        live_view()
+elif st.session_state.get("monitor") is not None:
+    # Monitoring switched off: stop following the feed rather than leave the
+    # file or socket open for the rest of the session
+    st.session_state.pop("monitor")[1].close()
+
 if not show_3d: 
     # Plotting only if dataframe is not empty
     if not df.empty:
@@ -69,50 +361,55 @@ if not show_3d:
             st.markdown("""---""") 
             st.write("")
             # Add a slider to control the background image opacity 
-            opacity = st.slider('Select chart background opacity', 0.0, 1.0, 1.0) 
-
-            # Check if "source" column is present in the DataFrame
-            if "Source" in df.columns:
-                fig = px.scatter_polar(df, r="C", theta="H", color="Source", direction='counterclockwise', start_angle=-23, text="Toner", height=600,
-                                       hover_data=df.columns, range_r=[0, 130])
-            else:
-                fig = px.scatter_polar(df, r="C", theta="H", direction='counterclockwise', start_angle=-23, text="Toner", height=600,
-                                       hover_data=df.columns, range_r=[0, 130])
-            
-            fig.update_layout( 
-                legend=dict(
-                    orientation="v",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="center",
-                    x=1
-                ),       
-                polar_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
+            opacity = st.slider('Select chart background opacity', 0.0, 1.0, 1.0, key="wheel_opacity") 
+            # Draw the wheel at the entered lightness, or at a fixed mid lightness
+            wheel_L = (L_value if st.checkbox("Wheel at entered L", value=False, key="wheel_at_entered_L")
+                       else wheel.DEFAULT_L)
+
+            # Colour by tolerance when highlighting, otherwise by Source if present
+            colour_by = "Tolerance" if "Tolerance" in df.columns else "Source"
+
+            def build_polar():
+                # Only send raw points and labels while they fit in the payload budget;
+                # otherwise draw one marker per C/H bin sized by its count
+                if summary_only:
+                    fig, note = figures.group_summary_polar(group_stats, group_by, sigma), None
+                    if show_gamut:
+                        fig.add_trace(figures.gamut_trace_polar(wheel_L))
+                    return fig, note
+                if density:
+                    fig, note = figures.density_polar(df, c_step, h_step, l_band), None
+                elif use_lod:
+                    fig, note = figures.lod_polar(df, colour_by, c_range, h_range, budget_kb * 1000)
+                else:
+                    fig, note = figures.scatter_polar(df, colour_by), None
+                if group_key is not None:
+                    fig.add_traces(figures.group_traces_polar(group_stats, group_by, sigma))
+                if show_gamut:
+                    fig.add_trace(figures.gamut_trace_polar(wheel_L))
+                return fig, note
+
+            # Reuse the figure while only its layout changes; newly added points
+            # go on as a separate small trace
+            lod_key = density_key if density else (budget_kb, c_range, h_range) if use_lod else None
+            fig, note = st.session_state.figures.get(
+                "polar", (base_key, tolerance_key, lod_key, group_key, show_gamut and wheel_L), rows,
+                build_polar, lambda start: figures.added_trace_polar(added_rows(start)),
+                len(df) if aggregated else base_rows, overlay_key)
+            if note:
+                st.caption(note)
+
+            fig.update_layout(
                 polar=dict(
                     radialaxis=dict(showticklabels=show_scale, visible=show_scale)
                 ),
-                hoverlabel=dict(bgcolor="white", font_size=16, font_family="Rockwell"),
-                images=[dict(
-                    source= "app/wheel.jpg",    # "https://iili.io/JUVtZog.png"
-                    xref="paper", yref="paper",
-                    x=0.503, y=0.503,
-                    sizex=1.0, sizey=1.13,
-                    xanchor="center",
-                    yanchor="middle",
-                    sizing="contain",
-                    layer="below"
-                )],
-                margin=dict(l=50, r=50, t=50, b=50)
+                # Hue wheel drawn from the LCH maths, cached and sent inline
+                images=[wheel.wheel_image(L=wheel_L, opacity=opacity)],
             )
 
-            # Update the image and grid
-            fig.update_layout_images(opacity=opacity)
-            fig.update_traces(marker=dict(size=10))
-            fig.update_traces(textposition='top left')  # Adjust marker size as needed
-        
             # Plot chart on screen
-            st.plotly_chart(fig)
+            with instrument.timer("plotly_chart"):
+                st.plotly_chart(fig)
         except Exception as e:
             st.error(f"Error generating plot: {e}")
     else:
@@ -120,58 +417,58 @@ if not show_3d:
 else:
     if not df.empty:
         try:
-            L_values = df['L'].tolist()
-            C_values = df['C'].tolist()
-            H_values = df['H'].tolist()
-            
-            # Ensure 'Toner' column exists in the DataFrame
-            Toners = df['Toner'].tolist() if 'Toner' in df.columns else [""] * len(df)
-            
-            # Define marker shapes based on 'Source' values if 'Source' column exists
-            if 'Source' in df.columns:
-                sources = df['Source'].tolist()
-                unique_sources = list(set(sources))
-                symbols = ['circle', 'square', 'diamond', 'cross', 'x', 'star', 'triangle-up', 'triangle-down']
-                source_symbol_map = {source: symbols[i % len(symbols)] for i, source in enumerate(unique_sources)}
-                marker_symbols = [source_symbol_map[source] for source in sources]
-            else:
-                marker_symbols = ['circle'] * len(df)
-
-            df2 = lcm.plot_lch_colors(L_values, C_values, H_values)
-            colours = [i for i in df2[1]]  # Extract color data from the result
-
-            # Generate hover text
-            hover_text = [f'L: {L}<br>C: {C}<br>H: {H}<br>Toner: {toner}'
-                          for L, C, H, toner in zip(L_values, C_values, H_values, Toners)]
-
-            # Create 3D scatter plot
-            fig = go.Figure(data=[go.Scatter3d(
-                x=C_values,
-                y=H_values,
-                z=L_values,
-                mode='markers',
-                marker=dict(
-                    size=7,
-                    color=colours,
-                    opacity=0.8,
-                    symbol=marker_symbols  # Set marker symbols based on source
-                ),
-                text=hover_text,
-                hoverinfo='text'
-            )])
+            def build_3d():
+                if summary_only:
+                    fig = figures.group_summary_3d(group_stats, group_by)
+                elif density:
+                    fig = figures.density_3d(df, l_step, c_step, h_step)
+                else:
+                    fig = build_points_3d()
+                if group_key is not None and not summary_only:
+                    fig.add_trace(figures.group_trace_3d(group_stats, group_by))
+                if show_gamut:
+                    fig.add_trace(figures.gamut_trace_3d())
 
-            # Update layout
-            fig.update_layout(
-                scene=dict(
-                    xaxis_title='Chroma (C)',
-                    yaxis_title='Hue (H)',
-                    zaxis_title='Lightness (L)',
-                ),
-                margin=dict(l=0, r=0, b=0, t=0)
-            )
+                # Update layout
+                fig.update_layout(
+                    scene=dict(
+                        xaxis_title='Chroma (C)',
+                        yaxis_title='Hue (H)',
+                        zaxis_title='Lightness (L)',
+                    ),
+                    margin=dict(l=0, r=0, b=0, t=0)
+                )
+                return fig, None
+
+            def build_points_3d():
+                # Colours are cached per dataset, so only the figure is rebuilt on reruns
+                colours = cached.lch_colours(data_key, df['L'].to_numpy(), df['C'].to_numpy(), df['H'].to_numpy(),
+                                             backend="lut" if lut_colours else "exact")
+
+                # One trace per Source (or tolerance band) with packed colours and
+                # browser-side hover text
+                return figures.scatter_3d(df, colours, by="Tolerance" if "Tolerance" in df.columns else "Source")
 
-            st.plotly_chart(fig)
+            fig, _ = st.session_state.figures.get(
+                "3d", (base_key, tolerance_key, density_key if density else lut_colours, group_key, show_gamut),
+                rows, build_3d, lambda start: figures.added_trace_3d(added_rows(start)),
+                len(df) if aggregated else base_rows, overlay_key)
+
+            with instrument.timer("plotly_chart"):
+                st.plotly_chart(fig)
         except Exception as e:
             st.error(f"Error generating 3D plot: {e}")
     else:
         st.info("Upload data or add LCH values to generate plot.")
+
+# Diagnostics panel: per-stage timings for this run. Stages served from a cache
+# don't appear.
+if st.sidebar.checkbox("Diagnostics", key="diagnostics") and instrument.enabled():
+    records, counters = instrument.stop()
+    with st.sidebar.expander("Timings", expanded=True):
+        st.dataframe(pd.DataFrame(records, columns=["Stage", "Seconds"]), hide_index=True)
+        for name, value in counters.items():
+            st.caption(f"{name}: {value:,}")
+        shared = cached.shared_datasets().stats()
+        st.caption(f"Shared datasets: {shared['datasets']} ({shared['bytes'] / 1e6:.1f} MB, "
+                   f"{shared['leases']} sessions)")
@@ -0,0 +1,131 @@
+import argparse
+import glob
+import hashlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import export
+import ingest
+import plot_3d as lcm
+
+# Offline batch conversion. Converts every input CSV to L,C,H,R,G,B across a
+# process pool, optionally saving a static 3D chart per file or report images
+# of chosen views through export.py's render cache. A failing file is reported
+# and skipped without stopping the rest of the run.
+#
+#   python batch.py archive/*.csv --out converted --images --workers 8
+#   python batch.py archive/*.csv --export polar 3d --format svg
+
+
+# Expand files, directories and glob patterns into a sorted list of CSV paths
+def find_inputs(patterns):
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(pattern, "*.csv")))
+        else:
+            paths.update(glob.glob(pattern))
+    # The same file reached by two spellings of its path is converted once
+    return sorted({os.path.abspath(path): os.path.normpath(path) for path in sorted(paths)}.values())
+
+
+# Output name stem for each input: its path relative to the inputs' common
+# folder, without the extension, so archive/a.csv and archive/sub/a.csv are
+# written as a_* and sub/a_* rather than over each other. Raises ValueError if
+# two inputs would still share a stem (e.g. a.csv and a.CSV on a case-insensitive
+# disk).
+def output_stems(paths):
+    if not paths:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    stems = {path: os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0] for path in paths}
+    seen = {}
+    for path, stem in stems.items():
+        other = seen.setdefault(os.path.normcase(stem).lower(), path)
+        if other != path:
+            raise ValueError(f"{other} and {path} would write the same output files")
+    return stems
+
+
+# Convert one file, writing its outputs under out_dir as stem_*. Runs in a
+# worker process and returns (path, rows, error).
+def convert_file(path, out_dir, stem, images=False, backend="exact", exports=(), format="png"):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        df = ingest.read_colour_csv(io.BytesIO(data))
+        points, colours = lcm.plot_lch_colors(df['L'].to_numpy(), df['C'].to_numpy(),
+                                              df['H'].to_numpy(), backend=backend)
+        df['R'], df['G'], df['B'] = colours[:, 0], colours[:, 1], colours[:, 2]
+
+        name = os.path.join(out_dir, stem)
+        os.makedirs(os.path.dirname(name), exist_ok=True)
+        df.to_csv(f"{name}_lch.csv", index=False)
+        if images:
+            # Shrink markers as the point count grows so dense files stay readable
+            lcm.save_lch_plot(points, colours, f"{name}_lch.png",
+                              marker_size=export.marker_size(len(df)))
+        # Report images, cached by file content so unchanged files are not redrawn
+        digest = hashlib.sha256(data).hexdigest() if exports else None
+        for view in exports:
+            with open(f"{name}_{view}.{format}", "wb") as f:
+                f.write(export.render_cached(digest, df, view, format))
+        return path, len(df), None
+    except Exception as e:
+        return path, 0, f"{type(e).__name__}: {e}"
+
+
+def run(paths, out_dir, workers=None, images=False, backend="exact", exports=(), format="png",
+        log=sys.stderr):
+    stems = output_stems(paths)
+    os.makedirs(out_dir, exist_ok=True)
+    failures = []
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convert_file, path, out_dir, stems[path], images, backend, exports, format)
+                   for path in paths]
+        for done, future in enumerate(as_completed(futures), 1):
+            path, rows, error = future.result()
+            if error:
+                failures.append((path, error))
+                print(f"[{done}/{len(paths)}] FAILED {path}: {error}", file=log)
+            else:
+                print(f"[{done}/{len(paths)}] {path}: {rows:,} rows", file=log)
+
+    print(f"Converted {len(paths) - len(failures)} of {len(paths)} files "
+          f"in {time.perf_counter() - start:.1f}s", file=log)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Lab/LCH CSV files to L,C,H,R,G,B in bulk.")
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--out", default="converted", help="output directory (default: converted)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--images", action="store_true", help="also save a static 3D chart per file")
+    parser.add_argument("--backend", choices=["exact", "lut"], default="exact",
+                        help="colour conversion backend (default: exact)")
+    parser.add_argument("--export", nargs="+", choices=export.VIEWS, default=[], metavar="VIEW",
+                        help="also save report images of these views (polar, 3d)")
+    parser.add_argument("--format", choices=export.FORMATS, default="png",
+                        help="image format for --export (default: png)")
+    args = parser.parse_args(argv)
+
+    paths = find_inputs(args.inputs)
+    if not paths:
+        parser.error("no input files found")
+    try:
+        output_stems(paths)
+    except ValueError as e:
+        parser.error(str(e))
+    failures = run(paths, args.out, workers=args.workers, images=args.images, backend=args.backend,
+                   exports=args.export, format=args.format)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import plotly
+
+import delta_e
+import figures
+import ingest
+import lch_convert as lc
+import lut
+import plot_3d as lcm
+
+# Benchmarks for the conversion and plotting hot paths. `python bench.py` runs
+# the suite over synthetic datasets and writes the timings to JSON so runs from
+# different versions can be compared; `--baselines` also times the old
+# row-by-row code paths and the lookup table against the current ones.
+
+
+# The original point-by-point conversion, kept as the reference for parity
+# checks and as the baseline for timings
+def _scalar_lch_to_rgb(L, C, H):
+    H_rad = np.deg2rad(H)
+    a = np.cos(H_rad) * C
+    b = np.sin(H_rad) * C
+
+    Y = (L + 16) / 116
+    X = a / 500 + Y
+    Z = Y - b / 200
+    X = 95.047 * ((X ** 3) if (X ** 3 > 0.008856) else ((X - 16 / 116) / 7.787))
+    Y = 100.000 * ((Y ** 3) if (Y ** 3 > 0.008856) else ((Y - 16 / 116) / 7.787))
+    Z = 108.883 * ((Z ** 3) if (Z ** 3 > 0.008856) else ((Z - 16 / 116) / 7.787))
+
+    X /= 100
+    Y /= 100
+    Z /= 100
+    R = X *  3.2406 + Y * -1.5372 + Z * -0.4986
+    G = X * -0.9689 + Y *  1.8758 + Z *  0.0415
+    B = X *  0.0557 + Y * -0.2040 + Z *  1.0570
+    R = 1 if R > 1 else 0 if R < 0 else R
+    G = 1 if G > 1 else 0 if G < 0 else G
+    B = 1 if B > 1 else 0 if B < 0 else B
+    return np.array([R, G, B])
+
+
+def random_lch(n, seed=0):
+    rng = np.random.default_rng(seed)
+    L = rng.uniform(0, 100, n)
+    C = rng.uniform(0, 130, n)
+    H = rng.uniform(0, 360, n)
+    return L, C, H
+
+
+def _time(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_parity(n=10_000):
+    L, C, H = random_lch(n, seed=1)
+    expected = np.array([_scalar_lch_to_rgb(*p) for p in zip(L, C, H)])
+    _, colours = lcm.plot_lch_colors(L, C, H)
+    return float(np.max(np.abs(colours - expected)))
+
+
+def bench_conversion(n=100_000):
+    L, C, H = random_lch(n)
+    scalar = _time(lambda: [_scalar_lch_to_rgb(*p) for p in zip(L, C, H)], repeat=1)
+    vector = _time(lc.lch_to_rgb_array, L, C, H)
+    return {'points': n, 'scalar_s': scalar, 'vector_s': vector,
+            'points_per_s': n / vector, 'speedup': scalar / vector}
+
+
+# Write a synthetic Lab CSV with n readings and return its path
+def write_lab_csv(path, n, seed=0):
+    lab = lc.lch_to_lab_array(*random_lch(n, seed))
+    df = pd.DataFrame(np.round(lab, 2), columns=['L', 'a', 'b'])
+    df['Toner'] = [f"T{i % 500}" for i in range(n)]
+    df.to_csv(path, index=False)
+    return path
+
+
+# The original upload path: parse, then convert row by row
+def _apply_ingest(path):
+    df = pd.read_csv(path)
+    df[['L', 'C', 'H']] = df.apply(
+        lambda row: (row['L'], np.hypot(row['a'], row['b']), np.degrees(np.arctan2(row['b'], row['a'])) % 360),
+        axis=1, result_type='expand')
+    return df
+
+
+def bench_ingest(n=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_lab_csv(os.path.join(tmp, 'lab.csv'), n)
+        row_wise = _time(_apply_ingest, path, repeat=1)
+        columnar = _time(ingest.read_colour_csv, path)
+    return {'rows': n, 'apply_s': row_wise, 'columnar_s': columnar,
+            'speedup': row_wise / columnar}
+
+
+def bench_lut(n=1_000_000):
+    table = lut.load_lut()
+    L, C, H = random_lch(n)
+    exact = _time(lc.lch_to_rgb_array, L, C, H)
+    lookup = _time(lut.lch_to_rgb_lut, L, C, H, table)
+    max_err, mean_err = lut.max_error(n, table=table)
+    return {'points': n, 'exact_s': exact, 'lut_s': lookup,
+            'max_error': max_err, 'mean_error': mean_err}
+
+
+def random_lab(n, seed=0):
+    return lc.lch_to_lab_array(*random_lch(n, seed))
+
+
+def bench_delta_e(n_pairs=200, n_target=1_000_000):
+    labs = random_lab(n_pairs, seed=2)
+    naive = _time(lambda: [[delta_e.ciede2000(p, q) for q in labs] for p in labs], repeat=1)
+    vector = _time(delta_e.pairwise, labs)
+    many = random_lab(n_target, seed=3)
+    target = _time(delta_e.to_target, many[0], many)
+    return {'pairs': n_pairs ** 2, 'naive_s': naive, 'pairwise_s': vector,
+            'speedup': naive / vector, 'target_points': n_target, 'target_s': target}
+
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1M': 1_000_000}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+
+
+# Synthetic Lab readings with Toner and Source labels, like an instrument export
+def synthetic_dataset(n, seed=0):
+    lab = lc.lch_to_lab_array(*random_lch(n, seed))
+    df = pd.DataFrame(np.round(lab, 2), columns=['L', 'a', 'b'])
+    df['Toner'] = [f"T{i % 500}" for i in range(n)]
+    df['Source'] = np.array(['Press 1', 'Press 2', 'Press 3', 'Proof'])[np.arange(n) % 4]
+    return df
+
+
+def _stage(results, stage, n, func, *args, repeat=3, **extra):
+    start = time.perf_counter()
+    value = func(*args)
+    seconds = time.perf_counter() - start
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        func(*args)
+        seconds = min(seconds, time.perf_counter() - start)
+    results.append(dict(stage=stage, points=n, seconds=seconds, **extra))
+    return value
+
+
+# Time every pipeline stage at one dataset size
+def bench_size(n, repeat=3, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "readings.csv")
+        synthetic_dataset(n, seed).to_csv(path, index=False)
+        df = _stage(results, "csv_ingest", n, ingest.read_colour_csv, path, repeat=repeat)
+
+    lab = df[['L', 'a', 'b']].to_numpy()
+    _stage(results, "lab_to_lch", n, lc.lab_to_lch_array, lab, repeat=repeat)
+    _, colours = _stage(results, "plot_lch_colors", n, lcm.plot_lch_colors,
+                        df['L'].to_numpy(), df['C'].to_numpy(), df['H'].to_numpy(), repeat=repeat)
+
+    polar, _ = _stage(results, "polar_figure", n, figures.lod_polar, df, repeat=repeat)
+    payload = _stage(results, "polar_to_json", n, polar.to_json, repeat=repeat)
+    results[-1]['bytes'] = len(payload)
+
+    density = _stage(results, "density_polar", n, figures.density_polar, df, repeat=repeat)
+    payload = _stage(results, "density_to_json", n, density.to_json, repeat=repeat)
+    results[-1]['bytes'] = len(payload)
+
+    scatter = _stage(results, "3d_figure", n, figures.scatter_3d, df, colours, repeat=repeat)
+    payload = _stage(results, "3d_to_json", n, scatter.to_json, repeat=repeat)
+    results[-1]['bytes'] = len(payload)
+    return results
+
+
+# Modules app.py imports at the top of every script run, and the heavy ones
+# that should only load once their feature is used
+APP_MODULES = ["streamlit", "numpy", "pandas", "ingest", "wheel", "cached", "lod", "figures",
+               "session_store", "neighbours", "lch_convert", "delta_e", "export", "instrument",
+               "monitor", "library"]
+DEFERRED_MODULES = ["matplotlib", "scipy", "plotly.express"]
+
+
+# Cold import of the app modules in a fresh interpreter, as on a new container.
+# Uses -X importtime for the per-module cumulative times.
+def bench_startup(modules=APP_MODULES, repeat=3):
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (f"import sys; import {', '.join(modules)}; "
+            f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))")
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=here,
+                              capture_output=True, text=True, check=True)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, proc)
+
+    seconds, proc = best
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | package", nested imports indented
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or parts[2].startswith("  "):
+            continue
+        name = parts[2].strip()
+        if name in modules:
+            cumulative[name] = int(parts[1]) / 1e6
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return dict(stage="startup_import", points=0, seconds=seconds, modules=cumulative, deferred_loaded=loaded)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat=3, startup=True):
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'packages': {'numpy': np.__version__, 'pandas': pd.__version__, 'plotly': plotly.__version__},
+        'results': [],
+    }
+    if startup:
+        report['results'].append(bench_startup(repeat=repeat))
+    for label in sizes:
+        report['results'].extend(bench_size(SIZES[label], repeat=repeat))
+    return report
+
+
+def print_report(report, previous=None):
+    before = {}
+    if previous:
+        before = {(r['stage'], r['points']): r['seconds'] for r in previous['results']}
+    for r in report['results']:
+        line = f"{r['stage']:<16}{r['points']:>10,}  {r['seconds']:8.4f}s"
+        if 'bytes' in r:
+            line += f"  {r['bytes'] / 1e6:7.2f} MB"
+        if r.get('deferred_loaded'):
+            line += f"  (loaded at startup: {', '.join(r['deferred_loaded'])})"
+        old = before.get((r['stage'], r['points']))
+        if old:
+            line += f"  ({r['seconds'] / old:.2f}x vs {previous.get('commit') or 'previous'})"
+        print(line)
+
+
+def print_baselines():
+    print(f"Max abs difference vs scalar path: {check_parity():.3g}")
+    for n in (1_000, 100_000):
+        r = bench_conversion(n)
+        print(f"{n:>9,} points: scalar {r['scalar_s']:.3f}s, vector {r['vector_s']:.4f}s "
+              f"({r['points_per_s']:,.0f} pts/s, {r['speedup']:.0f}x)")
+    r = bench_ingest()
+    print(f"CSV ingest {r['rows']:,} rows: apply {r['apply_s']:.2f}s, columnar {r['columnar_s']:.2f}s "
+          f"({r['speedup']:.0f}x)")
+    r = bench_lut()
+    print(f"LUT {r['points']:,} points: exact {r['exact_s']:.3f}s, lut {r['lut_s']:.3f}s, "
+          f"max error {r['max_error']:.4f}, mean error {r['mean_error']:.2g}")
+    r = bench_delta_e()
+    print(f"CIEDE2000 {r['pairs']:,} pairs: naive loop {r['naive_s']:.2f}s, pairwise {r['pairwise_s']:.4f}s "
+          f"({r['speedup']:.0f}x); target vs {r['target_points']:,} readings {r['target_s']:.3f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LCH plotter hot paths.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES),
+                        help="dataset sizes to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best is kept")
+    parser.add_argument("--out", help="JSON file to write (default: bench_results/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--startup", action="store_true",
+                        help="only time the cold import of the app modules")
+    parser.add_argument("--baselines", action="store_true",
+                        help="also time the old row-by-row paths and the lookup table")
+    args = parser.parse_args(argv)
+
+    report = run_suite([] if args.startup else args.sizes, repeat=args.repeat)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = report['created'].replace(':', '').replace('-', '')
+        out = os.path.join(RESULTS_DIR, f"{report['commit'] or 'local'}-{stamp}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.baselines:
+        print_baselines()
+
+
+if __name__ == "__main__":
+    main()
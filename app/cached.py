@@ -0,0 +1,160 @@
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import dataset_cache
+import delta_e
+import gamut
+import groups
+import ingest
+import instrument
+import library
+import neighbours
+import plot_3d as lcm
+import worker
+
+# Cached loaders for app.py. Streamlit reruns the whole script on every widget
+# change, so parsed uploads and converted colours are kept here, keyed by a hash
+# of their content. Each cache holds at most MAX_ENTRIES results and drops the
+# least recently used one when full. Parsed uploads are held once per server in
+# a SharedDatasets and leased to the sessions viewing them.
+
+MAX_ENTRIES = 8
+# Seconds a run waits for a background conversion's first chunks before
+# drawing what there is and showing progress
+FIRST_CHUNKS_WAIT = 2.0
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# One SharedDatasets for the whole server process, whichever session asks first
+@st.cache_resource
+def shared_datasets():
+    return dataset_cache.SharedDatasets()
+
+
+# Value for key from the shared datasets, keeping this session's lease on it.
+# The lease on whatever the session viewed before is released.
+def session_dataset(key, load):
+    lease = st.session_state.get("dataset_lease")
+    if lease is None or lease.released or lease.key != key:
+        release_session_dataset()
+        st.session_state.dataset_lease = shared_datasets().acquire(key, load)
+        lease = st.session_state.dataset_lease
+    return lease.value
+
+
+def release_session_dataset():
+    lease = st.session_state.get("dataset_lease")
+    if lease is not None:
+        lease.release()
+        del st.session_state["dataset_lease"]
+
+
+# Parsed uploads are shared between sessions, so a file is read once however
+# many users load it; the digest stands in for the data so it is only hashed once
+def load_colour_file(digest, data, name=""):
+    def load():
+        with st.spinner("Reading file..."):
+            return ingest.read_colour_file(io.BytesIO(data), name)
+    return session_dataset(digest, load)
+
+
+# Thread pool for background conversions, shared by every session
+@st.cache_resource
+def conversion_workers():
+    return worker.ConversionWorkers()
+
+
+# Parse and convert an upload on a worker thread. Returns the readings and
+# None once the whole file is in the shared datasets, or the readings from the
+# chunks done so far and the running job. Sessions uploading the same file
+# share its job. Waits a moment for the first chunks, so there is usually
+# something to draw straight away, but never for a worker to come free. A job
+# for another file is given up.
+def convert_in_background(digest, data, name=""):
+    job = st.session_state.get("conversion")
+    if digest in shared_datasets():
+        # Finished, and stored by another session sharing the job
+        if job is not None and job.key == digest and job.done:
+            instrument.merge(*job.timings)
+        cancel_conversion()
+        return load_colour_file(digest, data, name), None
+
+    if job is None or job.key != digest:
+        cancel_conversion()
+        job = conversion_workers().acquire(digest, lambda: ingest.iter_colour_file(io.BytesIO(data), name))
+        st.session_state.conversion = job
+    job.wait_first(FIRST_CHUNKS_WAIT)
+    if job.error is not None:
+        cancel_conversion()
+        raise job.error
+    if job.done:
+        df = session_dataset(digest, job.frame)
+        instrument.merge(*job.timings)
+        cancel_conversion()
+        return df, None
+    return job.frame(), job
+
+
+# Give up this session's conversion job; it stops if no other session wants it
+def cancel_conversion():
+    job = st.session_state.get("conversion")
+    if job is not None:
+        conversion_workers().release(job)
+        del st.session_state["conversion"]
+
+
+def stream_colour_csv(digest, data, max_points):
+    def load():
+        with st.spinner("Streaming file..."):
+            return ingest.stream_colour_csv(io.BytesIO(data), max_points=max_points)
+    return session_dataset(f"{digest}:{max_points}", load)
+
+
+# Arguments starting with an underscore are not hashed by Streamlit; the digest
+# stands in for them so large inputs are only hashed once.
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def lch_colours(digest, _L, _C, _H, backend="exact"):
+    return lcm.plot_lch_colors(np.asarray(_L), np.asarray(_C), np.asarray(_H), backend=backend)[1]
+
+
+# Readings added in the session (_overlay) are saved after the file's
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def parquet_bytes(digest, _df, _overlay=None):
+    if _overlay is not None and not _overlay.empty:
+        _df = _overlay if _df.empty else pd.concat([_df, _overlay], ignore_index=True)
+    return ingest.to_parquet_bytes(_df)
+
+
+# The KD-tree is shared rather than copied per rerun, so it uses cache_resource
+@st.cache_resource(max_entries=MAX_ENTRIES, show_spinner="Indexing readings...")
+def colour_index(digest, _df):
+    return neighbours.ColourIndex(neighbours.lab_of(_df))
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def delta_e_to_target(digest, _df, target, metric):
+    return delta_e.to_target(target, neighbours.lab_of(_df), metric)
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def gamut_flags(digest, _df):
+    return gamut.in_gamut(_df['L'].to_numpy(), _df['C'].to_numpy(), _df['H'].to_numpy())
+
+
+@st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)
+def group_stats(digest, _df, by):
+    return groups.group_stats(_df, by)
+
+
+# An open colour library, shared by every session. The stamp changes when the
+# library is appended to, so the next run opens it again at its new size.
+@st.cache_resource(max_entries=MAX_ENTRIES)
+def colour_library(path, stamp):
+    return library.ColourLibrary(path)
@@ -0,0 +1,104 @@
+import collections
+import threading
+import weakref
+
+# Parsed datasets shared by every session on the server. Entries are keyed by
+# the content hash of the uploaded file, so when several users load the same
+# file it is parsed and converted once and held in memory once. Sessions hold a
+# Lease on the entry they are viewing; an entry nobody holds is kept on a short
+# idle list, so the next upload of the same file is instant, and then dropped.
+#
+# Values are shared, not copied: treat them as read-only. Copy-on-write is off
+# by default in the pinned pandas, so nothing stops an in-place write; derive
+# new frames with assign() or boolean indexing (both return copies) and only
+# add columns to those.
+
+IDLE_ENTRIES = 4
+
+
+class Lease:
+
+    def __init__(self, datasets, key, value):
+        self.key = key
+        self.value = value
+        # Released when the session drops the lease, e.g. when the session ends
+        self._finalizer = weakref.finalize(self, datasets._release, key)
+
+    def release(self):
+        self.value = None
+        self._finalizer()
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+
+class SharedDatasets:
+
+    def __init__(self, idle_entries=IDLE_ENTRIES):
+        self.idle_entries = idle_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Entries with no leases, least recently released first
+        self._idle = collections.OrderedDict()
+
+    # Lease the value for key, calling load() to build it if no session has it.
+    # Sessions that ask for the same key while it loads wait for that load.
+    def acquire(self, key, load):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'value': None, 'loaded': False, 'refs': 0, 'loading': threading.Lock()}
+                self._entries[key] = entry
+            entry['refs'] += 1
+            self._idle.pop(key, None)
+
+        try:
+            with entry['loading']:
+                if not entry['loaded']:
+                    entry['value'] = load()
+                    entry['loaded'] = True
+        except BaseException:
+            self._release(key)
+            raise
+        return Lease(self, key, entry['value'])
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry['refs'] -= 1
+            if entry['refs'] > 0:
+                return
+            if not entry['loaded']:
+                del self._entries[key]
+                return
+            self._idle[key] = None
+            while len(self._idle) > self.idle_entries:
+                del self._entries[self._idle.popitem(last=False)[0]]
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Whether key is loaded, so acquiring it will not have to wait
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry['loaded']
+
+    # Entries, leases held and approximate bytes, for the diagnostics panel
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {'datasets': len(entries),
+                'leases': sum(e['refs'] for e in entries),
+                'bytes': sum(_nbytes(e['value']) for e in entries if e['loaded'])}
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True).sum())
+    return getattr(value, 'nbytes', 0)
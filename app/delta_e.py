@@ -0,0 +1,130 @@
+import numpy as np
+
+# Vectorised colour-difference formulas on Lab arrays. Inputs broadcast
+# against each other, so a single (3,) target can be compared with an (N,3)
+# array of readings in one call. All-pairs comparisons are done in row blocks
+# so memory stays bounded however many readings there are.
+
+
+def _lab(lab):
+    lab = np.asarray(lab, dtype=np.float64)
+    return lab[..., 0], lab[..., 1], lab[..., 2]
+
+
+def cie76(lab1, lab2):
+    L1, a1, b1 = _lab(lab1)
+    L2, a2, b2 = _lab(lab2)
+    return np.sqrt((L1 - L2) ** 2 + (a1 - a2) ** 2 + (b1 - b2) ** 2)
+
+
+# CIE94 with graphic-arts weights (kL = 1, K1 = 0.045, K2 = 0.015); lab1 is the reference
+def cie94(lab1, lab2, kL=1.0, K1=0.045, K2=0.015):
+    L1, a1, b1 = _lab(lab1)
+    L2, a2, b2 = _lab(lab2)
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    dL = L1 - L2
+    dC = C1 - C2
+    dH2 = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - dC ** 2, 0)
+    S_C = 1 + K1 * C1
+    S_H = 1 + K2 * C1
+    return np.sqrt((dL / kL) ** 2 + (dC / S_C) ** 2 + dH2 / S_H ** 2)
+
+
+# CIEDE2000 following Sharma, Wu and Dalal (2005), with kL = kC = kH = 1
+def ciede2000(lab1, lab2, kL=1.0, kC=1.0, kH=1.0):
+    L1, a1, b1 = _lab(lab1)
+    L2, a2, b2 = _lab(lab2)
+
+    C1 = np.hypot(a1, b1)
+    C2 = np.hypot(a2, b2)
+    C_bar7 = ((C1 + C2) / 2) ** 7
+    G = 0.5 * (1 - np.sqrt(C_bar7 / (C_bar7 + 25.0 ** 7)))
+
+    a1p = (1 + G) * a1
+    a2p = (1 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+
+    # Hue difference, taking the short way round and zero for achromatic pairs
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    chroma_product = C1p * C2p
+    dhp = np.where(chroma_product == 0, 0.0, dhp)
+    dHp = 2 * np.sqrt(chroma_product) * np.sin(np.radians(dhp) / 2)
+
+    L_bar = (L1 + L2) / 2
+    C_bar = (C1p + C2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(np.abs(h1p - h2p) > 180,
+                     np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2),
+                     h_sum / 2)
+    h_bar = np.where(chroma_product == 0, h_sum, h_bar)
+
+    T = (1 - 0.17 * np.cos(np.radians(h_bar - 30))
+         + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6))
+         - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    d_theta = 30 * np.exp(-(((h_bar - 275) / 25) ** 2))
+    C_bar7 = C_bar ** 7
+    R_C = 2 * np.sqrt(C_bar7 / (C_bar7 + 25.0 ** 7))
+    S_L = 1 + 0.015 * (L_bar - 50) ** 2 / np.sqrt(20 + (L_bar - 50) ** 2)
+    S_C = 1 + 0.045 * C_bar
+    S_H = 1 + 0.015 * C_bar * T
+    R_T = -np.sin(np.radians(2 * d_theta)) * R_C
+
+    l_term = dLp / (kL * S_L)
+    c_term = dCp / (kC * S_C)
+    h_term = dHp / (kH * S_H)
+    return np.sqrt(l_term ** 2 + c_term ** 2 + h_term ** 2 + R_T * c_term * h_term)
+
+
+METRICS = {'CIE76': cie76, 'CIE94': cie94, 'CIEDE2000': ciede2000}
+
+# Rows per block in the all-pairs functions; a block holds chunk x N distances
+DEFAULT_CHUNK = 1024
+
+
+# Delta E from one Lab target to every row of an (N,3) array
+def to_target(target, labs, metric="CIEDE2000"):
+    return METRICS[metric](np.asarray(target, dtype=np.float64), labs)
+
+
+# All-pairs Delta E between labs1 and labs2 (or labs1 with itself), yielded as
+# (start_row, block) with block covering rows start_row onwards of labs1
+def iter_pairwise(labs1, labs2=None, metric="CIEDE2000", chunk=DEFAULT_CHUNK):
+    labs1 = np.asarray(labs1, dtype=np.float64)
+    labs2 = labs1 if labs2 is None else np.asarray(labs2, dtype=np.float64)
+    func = METRICS[metric]
+    for start in range(0, len(labs1), chunk):
+        yield start, func(labs1[start:start + chunk, None, :], labs2[None, :, :])
+
+
+# Full all-pairs matrix; only sensible when N x M fits in memory
+def pairwise(labs1, labs2=None, metric="CIEDE2000", chunk=DEFAULT_CHUNK):
+    blocks = [block for _, block in iter_pairwise(labs1, labs2, metric, chunk)]
+    if not blocks:
+        m = len(labs1 if labs2 is None else labs2)
+        return np.empty((0, m))
+    return np.vstack(blocks)
+
+
+# Index pairs (i, j) with i < j whose Delta E is within tolerance, e.g. to find
+# near-duplicate readings. Only the matching pairs are kept between blocks.
+def pairs_within(labs, tolerance, metric="CIEDE2000", chunk=DEFAULT_CHUNK):
+    found_i, found_j, found_d = [], [], []
+    for start, block in iter_pairwise(labs, None, metric, chunk):
+        i, j = np.nonzero(block <= tolerance)
+        i += start
+        upper = i < j
+        found_i.append(i[upper])
+        found_j.append(j[upper])
+        found_d.append(block[i[upper] - start, j[upper]])
+    if not found_i:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+    return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_d)
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import json
+import os
+import uuid
+
+import numpy as np
+
+import plot_3d as lcm
+import wheel
+
+# Static image export of the charts for reports, drawn with matplotlib so no
+# browser is needed. The polar chart puts the readings over the same hue wheel
+# as the app; the 3D chart is plot_3d.save_lch_plot. Renders are kept on disk
+# keyed by the dataset hash and the view parameters, so a report rebuilt from
+# unchanged data reuses its images.
+#
+#   data = export.render_cached(digest, df, "polar", "svg", L=65)
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".render_cache")
+VIEWS = ("polar", "3d")
+FORMATS = ("png", "svg")
+# Above this many points SVG markers are rasterised, or the file balloons
+SVG_VECTOR_POINTS = 20_000
+# The render cache keeps at most this many images and bytes, dropping the least
+# recently used first
+CACHE_MAX_FILES = 200
+CACHE_MAX_BYTES = 200_000_000
+
+
+# Marker area that shrinks as the point count grows, so dense data stays readable
+def marker_size(n, largest=100):
+    return float(np.clip(largest / np.sqrt(max(n, 1) / 100), 1, largest))
+
+
+def _colours(df):
+    return lcm.plot_lch_colors(df['L'].to_numpy(), df['C'].to_numpy(), df['H'].to_numpy())
+
+
+# Polar C/H chart over the hue wheel at lightness L, laid out like the app's
+# chart: hue counterclockwise from 23 degrees below due east, C from 0 to 130
+def render_polar(df, path, format=None, L=wheel.DEFAULT_L, opacity=1.0, size=8, dpi=100):
+    from matplotlib.figure import Figure
+
+    points, colours = _colours(df)
+    fig = Figure(figsize=(size, size), dpi=dpi)
+    box = [0.08, 0.08, 0.84, 0.84]
+
+    # The wheel goes on a plain axes underneath, matched to the polar axes' box
+    background = fig.add_axes(box)
+    background.imshow(wheel.render_wheel(wheel.DEFAULT_SIZE, L, opacity), extent=(-1, 1, -1, 1))
+    background.set_axis_off()
+
+    ax = fig.add_axes(box, projection='polar')
+    ax.patch.set_alpha(0)
+    ax.set_theta_offset(np.deg2rad(wheel.ROTATION))
+    ax.set_rlim(0, wheel.MAX_C)
+    ax.scatter(np.deg2rad(points[:, 2]), points[:, 1], c=colours, s=marker_size(len(points)),
+               edgecolors='black', linewidths=0.5,
+               rasterized=format == "svg" and len(points) > SVG_VECTOR_POINTS)
+    ax.set_title('LCH Chroma/Hue Plot')
+    fig.savefig(path, format=format)
+
+
+def render_3d(df, path, format=None):
+    points, colours = _colours(df)
+    lcm.save_lch_plot(points, colours, path, marker_size=marker_size(len(points)), format=format,
+                      rasterized=format == "svg" and len(points) > SVG_VECTOR_POINTS)
+
+
+def render(df, view="polar", format="png", **params):
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view {view!r}; expected one of {', '.join(VIEWS)}")
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}; expected one of {', '.join(FORMATS)}")
+    buffer = io.BytesIO()
+    if view == "polar":
+        render_polar(df, buffer, format=format, **params)
+    else:
+        render_3d(df, buffer, format=format, **params)
+    return buffer.getvalue()
+
+
+def render_key(digest, view, format, params):
+    spec = json.dumps({'view': view, 'format': format, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{digest}:{spec}".encode()).hexdigest()
+
+
+# Image bytes for (dataset digest, view, format, params), rendered only if no
+# earlier render with the same key is on disk
+def render_cached(digest, df, view="polar", format="png", **params):
+    path = os.path.join(CACHE_DIR, f"{render_key(digest, view, format, params)}.{format}")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        # Marks the image as recently used for eviction
+        os.utime(path)
+        return data
+    except OSError:
+        pass
+
+    data = render(df, view, format, **params)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Written under a temporary name so a concurrent reader never sees half a file
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        evict()
+    except OSError:
+        # A read-only install still works, just without the disk cache
+        pass
+    return data
+
+
+# Trim the render cache to max_files images and max_bytes, oldest use first
+def evict(max_files=CACHE_MAX_FILES, max_bytes=CACHE_MAX_BYTES):
+    entries = []
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort(reverse=True)
+    total = 0
+    for kept, (_, size, path) in enumerate(entries):
+        total += size
+        if kept >= max_files or total > max_bytes:
+            try:
+                os.remove(path)
+            except OSError:
+                # Already removed by another process trimming the cache
+                pass
@@ -0,0 +1,343 @@
+import numpy as np
+import plotly.graph_objects as go
+
+import gamut
+import groups
+import instrument
+import lch_convert as lc
+import lod
+
+# Figure builders shared by the apps. Data goes in as NumPy arrays, colours as
+# packed hex strings and hover text through customdata/hovertemplate, so large
+# datasets serialise quickly and the browser formats labels on demand.
+
+SYMBOLS = ['circle', 'square', 'diamond', 'cross', 'x', 'circle-open', 'square-open', 'diamond-open']
+
+HOVER_3D = 'L: %{z}<br>C: %{x}<br>H: %{y}<br>Toner: %{customdata}<extra></extra>'
+
+
+# Pack an (N,3) array of 0-1 RGB floats into '#rrggbb' strings. NaN channels
+# (readings with a blank value, which aren't drawn anyway) count as 0.
+def rgb_to_hex(colours):
+    rgb = np.clip(np.nan_to_num(np.asarray(colours, dtype=np.float64)), 0, 1)
+    rgb = np.round(rgb * 255).astype(np.uint32)
+    packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    return np.char.mod('#%06x', packed)
+
+
+# 3D scatter of L/C/H with one trace per value of `by` (Source by default),
+# each with its own symbol
+@instrument.timed("figure_3d")
+def scatter_3d(df, colours, size=7, opacity=0.8, by="Source"):
+    colours = rgb_to_hex(colours)
+    toners = df['Toner'].to_numpy() if 'Toner' in df.columns else np.full(len(df), "")
+
+    if by in df.columns:
+        codes, sources = df[by].factorize(use_na_sentinel=False)
+        groups = [(str(source), codes == i) for i, source in enumerate(sources)]
+    else:
+        groups = [(None, slice(None))]
+
+    # Traces are plain dicts and the figure skips per-element validation: the
+    # inputs are built here, and validating 500k colour strings costs seconds
+    traces = []
+    for i, (name, mask) in enumerate(groups):
+        traces.append(dict(
+            type='scatter3d',
+            x=df['C'].to_numpy()[mask],
+            y=df['H'].to_numpy()[mask],
+            z=df['L'].to_numpy()[mask],
+            mode='markers',
+            name=name,
+            showlegend=name is not None,
+            marker=dict(size=size, color=colours[mask], opacity=opacity,
+                        symbol=SYMBOLS[i % len(SYMBOLS)]),
+            customdata=toners[mask],
+            hovertemplate=HOVER_3D,
+        ))
+    return go.Figure(data=traces, _validate=False)
+
+
+# Polar C/H scatter with the chart's fixed styling. Binned frames from lod.py are
+# drawn with markers sized by their count and no text labels.
+@instrument.timed("figure_polar")
+def scatter_polar(df, colour_by="Source", binned=False):
+    # LCH files may not carry a Toner label column
+    text_col = "Toner" if "Toner" in df.columns and not binned else None
+    size_col = "count" if binned else None
+    # plotly.express is the slowest plotly import and only this chart uses it
+    import plotly.express as px
+
+    # Check if the colour column is present in the DataFrame
+    if colour_by in df.columns:
+        fig = px.scatter_polar(df, r="C", theta="H", color=colour_by, direction='counterclockwise', start_angle=-23, text=text_col, height=600,
+                               hover_data=df.columns, range_r=[0, 130], size=size_col)
+    else:
+        fig = px.scatter_polar(df, r="C", theta="H", direction='counterclockwise', start_angle=-23, text=text_col, height=600,
+                               hover_data=df.columns, range_r=[0, 130], size=size_col)
+
+    fig.update_layout(
+        legend=dict(
+            orientation="v",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=1
+        ),
+        polar_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        hoverlabel=dict(bgcolor="white", font_size=16, font_family="Rockwell"),
+        margin=dict(l=50, r=50, t=50, b=50)
+    )
+
+    # Update the grid
+    if not binned:
+        fig.update_traces(marker=dict(size=10))
+    fig.update_traces(textposition='top left')  # Adjust marker size as needed
+    return fig
+
+
+# Up to this many points, lod_polar builds the raw chart without estimating
+DIRECT_POINTS = 2000
+
+
+# Size in bytes of a figure's JSON, as sent to the browser
+def payload_bytes(fig):
+    return len(fig.to_json())
+
+
+# Polar chart as drawn by the app: raw points while they fit in the payload
+# budget, otherwise C/H bins, coarsened until the chart's JSON fits. Returns
+# the figure and a note when binned.
+@instrument.timed("polar_lod")
+def lod_polar(df, colour_by="Source", c_range=(0, 130), h_range=(0, 360),
+              budget_bytes=lod.DEFAULT_BUDGET_BYTES):
+    plot_df = lod.select_region(df, c_range, h_range)
+    # Small frames are simply drawn and measured; larger ones are sized from
+    # the payload of charts of samples first. Binning keeps every colour group,
+    # so their traces are a cost that fewer markers can't reduce.
+    if len(plot_df) <= DIRECT_POINTS:
+        per_point, overhead = 0.0, 0.0
+    else:
+        per_point, per_group, fixed = lod.payload_cost(
+            plot_df, lambda sample: payload_bytes(scatter_polar(sample, colour_by)), by=colour_by)
+        n_groups = plot_df[colour_by].nunique(dropna=False) if colour_by in plot_df.columns else 1
+        overhead = fixed + per_group * n_groups
+    max_points = lod.point_budget(per_point, overhead, budget_bytes)
+    if len(plot_df) <= max_points:
+        fig = scatter_polar(plot_df, colour_by)
+        size = payload_bytes(fig)
+        if size <= budget_bytes:
+            return fig, None
+        max_points = int(len(plot_df) * budget_bytes / size)
+
+    # The estimate is rechecked against the built chart, and the bins made
+    # coarser in proportion to the per-marker part if it is still over budget
+    c_step = h_step = 1.0
+    while True:
+        binned, (c_step, h_step) = lod.bin_to_budget(plot_df, max_points, c_step, h_step, by=colour_by)
+        fig = scatter_polar(binned, colour_by, binned=True)
+        size = payload_bytes(fig)
+        # Over max_points means the grid couldn't be made any coarser
+        if size <= budget_bytes or len(binned) > max_points or len(binned) <= 1:
+            break
+        max_points = max(1, int(len(binned) * (budget_bytes - overhead) / max(size - overhead, 1) * 0.95))
+    note = (f"{len(plot_df):,} readings shown as {len(binned):,} bins of "
+            f"{c_step:g} C x {h_step:g}° H. Zoom into a region to see raw points.")
+    return fig, note
+
+
+HOVER_DENSITY_POLAR = ('C: %{customdata[0]:g}-%{customdata[1]:g}<br>H: %{customdata[2]:g}-%{customdata[3]:g}°'
+                       '<br>Readings: %{customdata[4]:,}<extra></extra>')
+HOVER_DENSITY_3D = 'L: %{z}<br>C: %{x}<br>H: %{y}<br>Readings: %{customdata:,}<extra></extra>'
+
+
+# C/H density as a polar histogram: one bar segment per occupied bin, coloured
+# by its count, optionally for an L band only. Laid out like scatter_polar so
+# the hue wheel lines up.
+@instrument.timed("figure_density_polar")
+def density_polar(df, c_step=5.0, h_step=5.0, l_range=None):
+    hist = lod.polar_histogram(lod.select_lightness(df, l_range), c_step, h_step)
+    C0 = hist['C0'].to_numpy()
+    H0 = hist['H0'].to_numpy()
+    counts = hist['count'].to_numpy()
+    trace = dict(
+        type='barpolar',
+        r=np.full(len(hist), c_step),
+        base=C0,
+        theta=H0 + h_step / 2,
+        width=np.full(len(hist), h_step),
+        name="Readings",
+        marker=dict(color=counts, colorscale='Viridis', line=dict(width=0),
+                    colorbar=dict(title="Readings")),
+        customdata=np.column_stack([C0, C0 + c_step, H0, H0 + h_step, counts]),
+        hovertemplate=HOVER_DENSITY_POLAR,
+    )
+    return polar_figure([trace])
+
+
+# Polar figure from trace dicts with the same axes and styling as scatter_polar
+def polar_figure(traces):
+    fig = go.Figure(data=traces, _validate=False)
+    fig.update_layout(
+        height=600,
+        polar=dict(angularaxis=dict(direction='counterclockwise', rotation=-23),
+                   radialaxis=dict(range=[0, 130]), bgcolor='rgba(0,0,0,0)'),
+        paper_bgcolor='rgba(0,0,0,0)',
+        hoverlabel=dict(bgcolor="white", font_size=16, font_family="Rockwell"),
+        margin=dict(l=50, r=50, t=50, b=50),
+    )
+    return fig
+
+
+# L/C/H density in the 3D axes: one marker per occupied voxel, coloured by count
+@instrument.timed("figure_density_3d")
+def density_3d(df, l_step=5.0, c_step=5.0, h_step=10.0, opacity=0.6):
+    voxels = lod.voxel_density(df, l_step, c_step, h_step)
+    counts = voxels['count'].to_numpy()
+    trace = dict(
+        type='scatter3d',
+        x=voxels['C'].to_numpy(),
+        y=voxels['H'].to_numpy(),
+        z=voxels['L'].to_numpy(),
+        mode='markers',
+        name="Readings",
+        marker=dict(size=6, color=counts, colorscale='Viridis', opacity=opacity,
+                    colorbar=dict(title="Readings")),
+        customdata=counts,
+        hovertemplate=HOVER_DENSITY_3D,
+    )
+    return go.Figure(data=[trace], _validate=False)
+
+
+HOVER_GROUP = ('%{customdata[0]}<br>Readings: %{customdata[1]:,}<br>L: %{customdata[2]:.1f} ± %{customdata[3]:.1f}'
+               '<br>C: %{customdata[4]:.1f} ± %{customdata[5]:.1f}<br>H: %{customdata[6]:.1f}° ± %{customdata[7]:.1f}°'
+               '<extra></extra>')
+
+
+def _group_customdata(stats, by):
+    return np.column_stack([stats[by].astype(str).to_numpy(), stats['count'].to_numpy(),
+                            stats['L'].to_numpy(), stats['L std'].to_numpy(),
+                            stats['C'].to_numpy(), stats['C std'].to_numpy(),
+                            stats['H'].to_numpy(), stats['H spread'].to_numpy()]).astype(object)
+
+
+def _group_sizes(stats, smallest=6, largest=30):
+    root = np.sqrt(stats['count'].to_numpy(np.float64))
+    return smallest + (largest - smallest) * root / root.max() if len(root) else root
+
+
+# Group summary for the polar chart: one marker per group at its mean C and
+# circular-mean H, sized by count and coloured by its centroid, plus every
+# group's a/b covariance ellipse in a single line trace
+def group_traces_polar(stats, by, sigma=groups.DEFAULT_SIGMA):
+    colours = rgb_to_hex(lc.lch_to_rgb_array(stats['L'].to_numpy(), stats['Centroid C'].to_numpy(),
+                                             stats['Centroid H'].to_numpy()))
+    C, H = groups.ellipse_outlines(stats, sigma)
+    return [
+        dict(type='scatterpolar', r=C, theta=H, mode='lines', name=f"{by} {sigma:g}σ ellipses",
+             line=dict(color='black', width=1), hoverinfo='skip', connectgaps=False),
+        dict(type='scatterpolar', r=stats['C'].to_numpy(), theta=stats['H'].to_numpy(), mode='markers',
+             name=f"{by} centroids",
+             marker=dict(size=_group_sizes(stats), color=colours, line=dict(color='black', width=1)),
+             customdata=_group_customdata(stats, by), hovertemplate=HOVER_GROUP),
+    ]
+
+
+# Group centroids in the 3D axes, sized by count and coloured by their centroid
+def group_trace_3d(stats, by):
+    colours = rgb_to_hex(lc.lch_to_rgb_array(stats['L'].to_numpy(), stats['Centroid C'].to_numpy(),
+                                             stats['Centroid H'].to_numpy()))
+    return dict(type='scatter3d', x=stats['C'].to_numpy(), y=stats['H'].to_numpy(), z=stats['L'].to_numpy(),
+                mode='markers', name=f"{by} centroids",
+                marker=dict(size=_group_sizes(stats, 4, 16), color=colours, opacity=1.0,
+                            line=dict(color='black', width=1)),
+                customdata=_group_customdata(stats, by), hovertemplate=HOVER_GROUP)
+
+
+# Polar and 3D figures showing only the group summaries
+def group_summary_polar(stats, by, sigma=groups.DEFAULT_SIGMA):
+    return polar_figure(group_traces_polar(stats, by, sigma))
+
+
+def group_summary_3d(stats, by):
+    return go.Figure(data=[group_trace_3d(stats, by)], _validate=False)
+
+
+# sRGB boundary at one lightness as a closed line on the polar chart
+def gamut_trace_polar(L):
+    H, C = gamut.boundary_at(L)
+    return go.Scatterpolar(r=C, theta=H, mode='lines', name=f"sRGB gamut at L={L:g}",
+                           line=dict(color='black', width=2, dash='dot'), hoverinfo='skip')
+
+
+# sRGB boundary as a translucent shell in the C/H/L axes of the 3D view
+def gamut_trace_3d(l_step=2.0, h_step=4.0):
+    L = np.arange(0, 100 + l_step / 2, l_step)
+    H = np.arange(0, 360 + h_step / 2, h_step)
+    LL, HH = np.meshgrid(L, H, indexing='ij')
+    CC = gamut.max_chroma(LL, HH)
+    return go.Surface(x=CC, y=HH, z=LL, name="sRGB gamut", opacity=0.2, showscale=False,
+                      colorscale=[[0, 'grey'], [1, 'grey']], hoverinfo='skip')
+
+
+# Extra traces for readings appended after a figure was built
+def added_trace_3d(df, size=7, opacity=0.8):
+    colours = rgb_to_hex(lc.lch_to_rgb_array(df['L'].to_numpy(), df['C'].to_numpy(), df['H'].to_numpy()))
+    toners = df['Toner'].to_numpy() if 'Toner' in df.columns else np.full(len(df), "")
+    return go.Scatter3d(x=df['C'].to_numpy(), y=df['H'].to_numpy(), z=df['L'].to_numpy(),
+                        mode='markers', name="Added",
+                        marker=dict(size=size, color=colours, opacity=opacity),
+                        customdata=toners, hovertemplate=HOVER_3D)
+
+
+def added_trace_polar(df, size=10):
+    text = df['Toner'].to_numpy() if 'Toner' in df.columns else None
+    return go.Scatterpolar(r=df['C'].to_numpy(), theta=df['H'].to_numpy(), text=text,
+                           mode='markers+text' if text is not None else 'markers', name="Added",
+                           marker=dict(size=size), textposition='top left')
+
+
+# Keeps one figure per view between Streamlit reruns. The figure is only rebuilt
+# when its key changes; readings appended since it was built are drawn as one
+# small extra trace, and callers apply layout changes (scale, opacity) to the
+# kept figure in place instead of rebuilding its data.
+class FigureCache:
+
+    def __init__(self, max_delta=1000):
+        self.max_delta = max_delta
+        self._entries = {}
+
+    # build() returns (figure, info); build_delta(start) returns a trace for
+    # rows start onwards. base_rows is how many of the rows build() draws when
+    # the rest are always an overlay (default: all of them), and delta_key
+    # redraws the overlay when its rows change without their count changing.
+    # Returns the figure and the info from its last build.
+    def get(self, view, key, rows, build, build_delta=None, base_rows=None, delta_key=None):
+        entry = self._entries.get(view)
+        if entry is None or entry['key'] != key:
+            stale = True
+        elif base_rows is not None:
+            stale = base_rows != entry['rows']
+        else:
+            stale = (rows < entry['rows'] or rows - entry['rows'] > self.max_delta
+                     or (rows > entry['rows'] and build_delta is None))
+        if stale:
+            fig, info = build()
+            built = rows if base_rows is None else base_rows
+            entry = {'key': key, 'rows': built, 'fig': fig, 'info': info,
+                     'traces': len(fig.data), 'delta_rows': built, 'delta_key': None}
+            self._entries[view] = entry
+
+        fig = entry['fig']
+        if entry['delta_rows'] != rows or entry['delta_key'] != delta_key:
+            # Swap the previous delta trace for one covering every new row
+            fig.data = fig.data[:entry['traces']]
+            if rows > entry['rows']:
+                fig.add_trace(build_delta(entry['rows']))
+            entry['delta_rows'] = rows
+            entry['delta_key'] = delta_key
+        return fig, entry['info']
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,107 @@
+import os
+import uuid
+
+import numpy as np
+
+import lch_convert as lc
+
+# sRGB gamut boundary as a max-chroma table over (L, H). The table is found once
+# by bisecting every (L, H) cell at the same time, cached in memory and on
+# disk, and then answers "how much chroma fits here?" by bilinear lookup, so
+# flagging readings costs O(1) each with no per-point root finding.
+
+L_STEP = 1.0
+H_STEP = 1.0
+C_LIMIT = 200.0
+ITERATIONS = 30
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".gamut_cache")
+
+_tables = {}
+
+
+def _in_srgb(L, C, H):
+    rgb = lc.lch_to_rgb_array(L, C, H, clip=False)
+    return np.all((rgb >= 0) & (rgb <= 1), axis=-1)
+
+
+# Max in-gamut chroma for every (L, H) grid cell, shape (n_L, n_H). Assumes the
+# gamut is star-shaped around the neutral axis, which holds for sRGB.
+def build_table(l_step=L_STEP, h_step=H_STEP, in_gamut=_in_srgb):
+    L = np.arange(0, 100 + l_step / 2, l_step)
+    H = np.arange(0, 360 + h_step / 2, h_step)
+    LL, HH = np.meshgrid(L, H, indexing='ij')
+
+    lo = np.zeros(LL.shape)
+    hi = np.full(LL.shape, C_LIMIT)
+    # Grey at L=100 lands a hair outside [0, 1] through rounding; treat such
+    # cells as having no chroma room at all
+    lo_ok = in_gamut(LL, lo, HH)
+    for _ in range(ITERATIONS):
+        mid = (lo + hi) / 2
+        inside = in_gamut(LL, mid, HH)
+        lo = np.where(inside, mid, lo)
+        hi = np.where(inside, hi, mid)
+    return np.where(lo_ok, lo, 0.0)
+
+
+# Load the table from memory or disk, building it first if needed
+def load_table(l_step=L_STEP, h_step=H_STEP):
+    key = (l_step, h_step)
+    if key not in _tables:
+        path = os.path.join(CACHE_DIR, f"srgb_max_chroma_L{l_step:g}_H{h_step:g}.npy")
+        table = None
+        if os.path.exists(path):
+            try:
+                table = np.load(path)
+            except (OSError, ValueError, EOFError):
+                # Unreadable, e.g. left cut short by an older version; rebuilt below
+                table = None
+        if table is None:
+            table = build_table(l_step, h_step)
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                # Written under a temporary name so a concurrent reader never
+                # loads half a table
+                tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, table)
+                os.replace(tmp, path)
+            except OSError:
+                # A read-only install still works, just without the disk cache
+                pass
+        _tables[key] = table
+    return _tables[key]
+
+
+# Max chroma at each (L, H), bilinearly interpolated from the table
+def max_chroma(L, H, table=None, l_step=L_STEP, h_step=H_STEP):
+    if table is None:
+        table = load_table(l_step, h_step)
+    L = np.asarray(L, dtype=np.float64)
+    H = np.asarray(H, dtype=np.float64)
+    # Readings with a blank L or H have no boundary: looked up at 0 and
+    # given NaN afterwards
+    missing = ~(np.isfinite(L) & np.isfinite(H))
+    L = np.clip(np.where(missing, 0.0, L), 0, 100) / l_step
+    H = np.mod(np.where(missing, 0.0, H), 360) / h_step
+    n_L, n_H = table.shape
+
+    l0 = np.minimum(np.floor(L).astype(np.intp), n_L - 2)
+    h0 = np.minimum(np.floor(H).astype(np.intp), n_H - 2)
+    fl = L - l0
+    fh = H - h0
+    chroma = ((table[l0, h0] * (1 - fh) + table[l0, h0 + 1] * fh) * (1 - fl)
+              + (table[l0 + 1, h0] * (1 - fh) + table[l0 + 1, h0 + 1] * fh) * fl)
+    return np.where(missing, np.nan, chroma)
+
+
+# True where a reading fits inside sRGB, allowing `margin` chroma units of
+# slack; False for readings with a blank value
+def in_gamut(L, C, H, margin=0.0, table=None):
+    return np.asarray(C, dtype=np.float64) <= max_chroma(L, H, table) + margin
+
+
+# Boundary at one lightness as (H, max C) arrays, for drawing on the polar chart
+def boundary_at(L, h_step=H_STEP):
+    H = np.arange(0, 360 + h_step / 2, h_step)
+    return H, max_chroma(np.full(H.shape, L), H)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+import lch_convert as lc
+import neighbours
+
+# Summary statistics per group (Source, Toner, ...), worked out from one
+# factorize and a set of bincounts over the readings rather than a Python loop
+# per group, so thousands of groups cost about the same as a handful. Hue is
+# circular: its mean and spread come from the mean unit vector, and the spread
+# in the a/b plane is summarised as a covariance ellipse.
+
+# Ellipses are drawn this many standard deviations out; 2 sigma holds about
+# 86% of a 2D normal
+DEFAULT_SIGMA = 2.0
+ELLIPSE_POINTS = 48
+
+
+# One row per group: count, mean L and C, circular mean and spread of H, L and
+# C standard deviations, the Lab centroid and its a/b covariance ellipse (semi
+# axes in a/b units and the major axis angle in degrees)
+def group_stats(df, by="Source"):
+    codes, names = pd.factorize(df[by], use_na_sentinel=False)
+    k = len(names)
+    n = np.bincount(codes, minlength=k).astype(np.float64)
+
+    def mean(values):
+        return np.bincount(codes, weights=values, minlength=k) / n
+
+    L = df['L'].to_numpy(np.float64)
+    C = df['C'].to_numpy(np.float64)
+    h_rad = np.deg2rad(df['H'].to_numpy(np.float64))
+    lab = neighbours.lab_of(df)
+    a, b = lab[:, 1], lab[:, 2]
+
+    L_mean, C_mean, a_mean, b_mean = mean(L), mean(C), mean(a), mean(b)
+    sin_mean, cos_mean = mean(np.sin(h_rad)), mean(np.cos(h_rad))
+    resultant = np.clip(np.hypot(sin_mean, cos_mean), 1e-12, 1.0)
+
+    # Population (co)variances from E[xy] - E[x]E[y]
+    L_var = np.maximum(mean(L * L) - L_mean ** 2, 0)
+    C_var = np.maximum(mean(C * C) - C_mean ** 2, 0)
+    aa = np.maximum(mean(a * a) - a_mean ** 2, 0)
+    bb = np.maximum(mean(b * b) - b_mean ** 2, 0)
+    ab = mean(a * b) - a_mean * b_mean
+
+    # Eigenvalues and major-axis angle of each 2x2 covariance in closed form
+    half_trace = (aa + bb) / 2
+    root = np.sqrt(((aa - bb) / 2) ** 2 + ab ** 2)
+    major = np.sqrt(np.maximum(half_trace + root, 0))
+    minor = np.sqrt(np.maximum(half_trace - root, 0))
+    angle = np.degrees(0.5 * np.arctan2(2 * ab, aa - bb))
+
+    centroid = lc.lab_to_lch_array(L_mean, a_mean, b_mean)
+    return pd.DataFrame({
+        by: names,
+        'count': n.astype(np.int64),
+        'L': L_mean,
+        'C': C_mean,
+        'H': np.degrees(np.arctan2(sin_mean, cos_mean)) % 360,
+        'L std': np.sqrt(L_var),
+        'C std': np.sqrt(C_var),
+        'H spread': np.degrees(np.sqrt(-2 * np.log(resultant))),
+        'Centroid C': centroid[:, 1],
+        'Centroid H': centroid[:, 2],
+        'a': a_mean,
+        'b': b_mean,
+        'ellipse major': major,
+        'ellipse minor': minor,
+        'ellipse angle': angle,
+    })
+
+
+# Outlines of every group's a/b ellipse as C and H arrays, with a NaN between
+# groups so they can all go in one line trace
+def ellipse_outlines(stats, sigma=DEFAULT_SIGMA, points=ELLIPSE_POINTS):
+    t = np.linspace(0, 2 * np.pi, points)
+    theta = np.deg2rad(stats['ellipse angle'].to_numpy())[:, None]
+    major = sigma * stats['ellipse major'].to_numpy()[:, None]
+    minor = sigma * stats['ellipse minor'].to_numpy()[:, None]
+    a = stats['a'].to_numpy()[:, None] + major * np.cos(t) * np.cos(theta) - minor * np.sin(t) * np.sin(theta)
+    b = stats['b'].to_numpy()[:, None] + major * np.cos(t) * np.sin(theta) + minor * np.sin(t) * np.cos(theta)
+
+    gap = np.full((len(stats), 1), np.nan)
+    C = np.hstack([np.hypot(a, b), gap]).ravel()
+    H = np.hstack([np.degrees(np.arctan2(b, a)) % 360, gap]).ravel()
+    return C, H
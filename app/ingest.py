@@ -0,0 +1,233 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import lch_convert as lc
+
+# Shared ingest for the apps. Reads CSV, Parquet or Arrow files with the numeric
+# colour columns at a fixed float dtype and converts whole columns at once
+# instead of row by row.
+
+LAB_COLUMNS = ['L', 'a', 'b']
+LCH_COLUMNS = ['L', 'C', 'H']
+NUMERIC_COLUMNS = ('L', 'a', 'b', 'C', 'H')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+
+# Work out whether a set of column names holds Lab or LCH values
+def colour_space_of(columns):
+    columns = set(columns)
+    if set(LAB_COLUMNS) <= columns:
+        return "Lab"
+    if set(LCH_COLUMNS) <= columns:
+        return "LCH"
+    return None
+
+
+# Add C and H columns computed from the a/b column arrays
+def add_lch_columns(df):
+    lch = lc.lab_to_lch_array(df['L'].to_numpy(), df['a'].to_numpy(), df['b'].to_numpy())
+    dtype = df['L'].dtype
+    df['C'] = lch[:, 1].astype(dtype, copy=False)
+    df['H'] = lch[:, 2].astype(dtype, copy=False)
+    return df
+
+
+# Make sure a parsed frame has L, C and H columns, converting from Lab if needed
+def _to_lch(df):
+    space = colour_space_of(df.columns)
+    if space == "Lab":
+        with instrument.timer("lab_to_lch"):
+            return add_lch_columns(df)
+    if space == "LCH":
+        return df
+    raise ValueError("CSV must contain either 'L', 'a' and 'b' columns (Lab) "
+                     "or 'L', 'C' and 'H' columns (LCH).")
+
+
+# Read a CSV of Lab or LCH readings and return it with L, C and H columns.
+# Lab files keep their a/b columns; LCH files are passed through as they are.
+def read_colour_csv(source, dtype=np.float64):
+    with instrument.timer("csv_parse"):
+        df = pd.read_csv(source, dtype={col: dtype for col in NUMERIC_COLUMNS})
+    instrument.count("rows_read", len(df))
+    return _to_lch(df)
+
+
+# Read a Parquet or Arrow IPC (Feather) file of Lab or LCH readings. Numeric
+# columns are cast to the requested float dtype.
+def read_colour_table(source, dtype=np.float64, format="parquet"):
+    with instrument.timer(f"{format}_read"):
+        if format == "parquet":
+            df = pd.read_parquet(source)
+        else:
+            df = pd.read_feather(source)
+    instrument.count("rows_read", len(df))
+    numeric = {col: dtype for col in NUMERIC_COLUMNS if col in df.columns}
+    return _to_lch(df.astype(numeric, copy=False))
+
+
+# File format from the extension; anything unrecognised is treated as CSV
+def colour_format_of(name):
+    ext = os.path.splitext(name.lower())[1]
+    if ext in PARQUET_EXTENSIONS:
+        return "parquet"
+    if ext in ARROW_EXTENSIONS:
+        return "arrow"
+    return "csv"
+
+
+def read_colour_file(source, name="", dtype=np.float64):
+    format = colour_format_of(name)
+    if format == "csv":
+        return read_colour_csv(source, dtype)
+    return read_colour_table(source, dtype, format=format)
+
+
+# Serialise readings to Parquet bytes with typed float columns, e.g. to save a
+# session for reloading later
+def to_parquet_bytes(df, dtype=np.float64):
+    numeric = {col: dtype for col in NUMERIC_COLUMNS if col in df.columns}
+    buffer = io.BytesIO()
+    df.astype(numeric).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+# Parse readings pasted as text, one per line: three numbers in the given
+# colour space and an optional reference, separated by commas, tabs or spaces.
+# Returns a frame with L, C, H and Toner columns.
+def parse_pasted(text, colour_space="Lab"):
+    channels = LAB_COLUMNS if colour_space == "Lab" else LCH_COLUMNS
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return pd.DataFrame(columns=LCH_COLUMNS + ['Toner'])
+
+    # Split off the three numbers; whatever follows is the reference, spaces and all
+    parts = pd.Series(lines).str.strip().str.split(r"\s*[,\t;]\s*|\s+", n=3, regex=True, expand=True)
+    parts = parts.reindex(columns=range(4))
+    short = parts.iloc[:, :3].isna().any(axis=1).to_numpy()
+    if short.any():
+        raise ValueError(f"{lines[int(np.argmax(short))].strip()!r} needs three numbers")
+    df = parts.iloc[:, :3].astype(np.float64)
+    df.columns = channels
+    df['Toner'] = parts[3].fillna("").astype(str).str.strip()
+    return _to_lch(df)
+
+
+# Read a CSV in fixed-size chunks, yielding each chunk with L, C and H columns
+def iter_colour_csv(source, chunksize=100_000, dtype=np.float64):
+    reader = pd.read_csv(source, dtype={col: dtype for col in NUMERIC_COLUMNS},
+                         chunksize=chunksize)
+    with reader:
+        while True:
+            with instrument.timer("csv_parse"):
+                chunk = next(reader, None)
+            if chunk is None:
+                return
+            instrument.count("rows_read", len(chunk))
+            yield _to_lch(chunk)
+
+
+# Read a CSV, Parquet or Arrow file in chunks, yielding each chunk with L, C and
+# H columns and the fraction of the file read so far
+def iter_colour_file(source, name="", chunksize=100_000, dtype=np.float64):
+    format = colour_format_of(name)
+    if format == "csv":
+        total = source.seek(0, io.SEEK_END)
+        source.seek(0)
+        for chunk in iter_colour_csv(source, chunksize=chunksize, dtype=dtype):
+            yield chunk, min(source.tell() / total, 1.0) if total else 1.0
+        return
+
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    if format == "parquet":
+        parquet = pyarrow.parquet.ParquetFile(source)
+        total = parquet.metadata.num_rows
+        batches = parquet.iter_batches(batch_size=chunksize)
+    else:
+        table = pyarrow.feather.read_table(source)
+        total = table.num_rows
+        batches = table.to_batches(max_chunksize=chunksize)
+    done = 0
+    for batch in batches:
+        with instrument.timer(f"{format}_read"):
+            df = batch.to_pandas()
+        instrument.count("rows_read", len(df))
+        numeric = {col: dtype for col in NUMERIC_COLUMNS if col in df.columns}
+        done += len(df)
+        yield _to_lch(df.astype(numeric, copy=False)), done / total if total else 1.0
+
+
+# Running totals for L, C and H. Hue is summed as unit vectors so the mean
+# wraps correctly around 0/360.
+def new_stats():
+    return {'count': 0,
+            'L_sum': 0.0, 'L_sumsq': 0.0, 'L_min': np.inf, 'L_max': -np.inf,
+            'C_sum': 0.0, 'C_sumsq': 0.0, 'C_min': np.inf, 'C_max': -np.inf,
+            'H_sin': 0.0, 'H_cos': 0.0}
+
+
+def update_stats(stats, chunk):
+    stats['count'] += len(chunk)
+    for col in ('L', 'C'):
+        values = chunk[col].to_numpy(dtype=np.float64)
+        if len(values) == 0:
+            continue
+        stats[f'{col}_sum'] += values.sum()
+        stats[f'{col}_sumsq'] += np.square(values).sum()
+        stats[f'{col}_min'] = min(stats[f'{col}_min'], values.min())
+        stats[f'{col}_max'] = max(stats[f'{col}_max'], values.max())
+    h_rad = np.deg2rad(chunk['H'].to_numpy(dtype=np.float64))
+    stats['H_sin'] += np.sin(h_rad).sum()
+    stats['H_cos'] += np.cos(h_rad).sum()
+    return stats
+
+
+# Turn running totals into a small summary table
+def summarise_stats(stats):
+    n = stats['count']
+    rows = {}
+    for col in ('L', 'C'):
+        mean = stats[f'{col}_sum'] / n if n else np.nan
+        var = stats[f'{col}_sumsq'] / n - mean ** 2 if n else np.nan
+        rows[col] = {'mean': mean, 'std': np.sqrt(max(var, 0.0)),
+                     'min': stats[f'{col}_min'], 'max': stats[f'{col}_max']}
+    resultant = np.hypot(stats['H_sin'], stats['H_cos']) / n if n else np.nan
+    rows['H'] = {'mean': np.degrees(np.arctan2(stats['H_sin'], stats['H_cos'])) % 360 if n else np.nan,
+                 'std': np.degrees(np.sqrt(-2 * np.log(resultant))) if n and resultant > 0 else np.nan,
+                 'min': np.nan, 'max': np.nan}
+    return pd.DataFrame(rows).T
+
+
+# Stream a large CSV chunk by chunk, keeping only a uniform random sample of at
+# most max_points rows plus running statistics over every reading. Peak memory
+# is bounded by chunksize + max_points whatever the file size.
+def stream_colour_csv(source, chunksize=100_000, max_points=20_000, dtype=np.float64, seed=0):
+    rng = np.random.default_rng(seed)
+    stats = new_stats()
+    sample = None
+    sample_keys = np.empty(0)
+
+    for chunk in iter_colour_csv(source, chunksize=chunksize, dtype=dtype):
+        update_stats(stats, chunk)
+
+        # Keep the rows with the smallest random keys seen so far, which gives
+        # a uniform sample without holding the whole file
+        keys = np.concatenate([sample_keys, rng.random(len(chunk))])
+        pool = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        if len(pool) > max_points:
+            keep = np.argpartition(keys, max_points)[:max_points]
+            keep.sort()
+            pool = pool.iloc[keep].reset_index(drop=True)
+            keys = keys[keep]
+        sample, sample_keys = pool, keys
+
+    if sample is None:
+        sample = pd.DataFrame(columns=list(LCH_COLUMNS))
+    return sample, stats
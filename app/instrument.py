@@ -0,0 +1,114 @@
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+
+# Lightweight timers and counters for the pipeline stages. Recording is per
+# thread (Streamlit runs each session's script in its own thread) and is off
+# unless start() has been called, in which case timer() is a plain
+# nullcontext and count() returns straight away. Each recorded run is logged
+# as one JSON line on the "lch_plotter.timings" logger; unless logging has
+# been set up elsewhere, start() sends these lines to stderr.
+#
+#   instrument.start()
+#   with instrument.timer("csv_parse"):
+#       ...
+#   records, counters = instrument.stop()
+
+logger = logging.getLogger("lch_plotter.timings")
+
+_local = threading.local()
+_handler_lock = threading.Lock()
+
+
+def _recorder():
+    return getattr(_local, "recorder", None)
+
+
+def enabled():
+    return _recorder() is not None
+
+
+# Give the timings logger somewhere to write if the application has not
+# configured logging itself
+def _ensure_log_handler():
+    with _handler_lock:
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+        if not logger.hasHandlers():
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+            logger.addHandler(handler)
+
+
+def start():
+    _ensure_log_handler()
+    _local.recorder = {'records': [], 'counters': {}, 'start': time.perf_counter()}
+
+
+# Stop recording for this thread, log the run as one JSON line (unless log is
+# False) and return the (stage, seconds) records and the counters
+def stop(log=True):
+    recorder = _recorder()
+    if recorder is None:
+        return [], {}
+    _local.recorder = None
+    if not log:
+        return recorder['records'], recorder['counters']
+    total = time.perf_counter() - recorder['start']
+    # A stage timed more than once in a run (e.g. per chunk) is logged as its sum
+    stages = {}
+    for stage, seconds in recorder['records']:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+    logger.info(json.dumps({'total_s': round(total, 6),
+                            'stages': {stage: round(s, 6) for stage, s in stages.items()},
+                            'counters': recorder['counters']}))
+    return recorder['records'], recorder['counters']
+
+
+@contextlib.contextmanager
+def _timed(recorder, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder['records'].append((stage, time.perf_counter() - start))
+
+
+def timer(stage):
+    recorder = _recorder()
+    if recorder is None:
+        return contextlib.nullcontext()
+    return _timed(recorder, stage)
+
+
+def count(name, n=1):
+    recorder = _recorder()
+    if recorder is not None:
+        recorder['counters'][name] = recorder['counters'].get(name, 0) + n
+
+
+# Add records and counters taken on another thread (e.g. a background job) to
+# this thread's run
+def merge(records, counters):
+    recorder = _recorder()
+    if recorder is None:
+        return
+    recorder['records'].extend(records)
+    for name, n in counters.items():
+        count(name, n)
+
+
+# Decorator form of timer(), using the function name as the stage by default
+def timed(stage=None):
+    def decorate(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,69 @@
+import numpy as np
+
+# Batched colour conversions. Every function takes whole arrays, either
+# separate (N,) channels or a single (N,3) array, and returns arrays in one
+# pass. The scalar functions in plot_3d.py are thin wrappers around these.
+
+REF_X = 95.047
+REF_Y = 100.000
+REF_Z = 108.883
+
+
+# Split an (N,3) array into its three channels, or pass three channels through
+def _channels(x, y=None, z=None):
+    if y is None and z is None:
+        arr = np.asarray(x, dtype=np.float64)
+        return arr[..., 0], arr[..., 1], arr[..., 2]
+    return (np.asarray(x, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+            np.asarray(z, dtype=np.float64))
+
+
+def lab_to_lch_array(L, a=None, b=None):
+    L, a, b = _channels(L, a, b)
+    C = np.hypot(a, b)
+    H = np.degrees(np.arctan2(b, a)) % 360
+    return np.stack([L, C, H], axis=-1)
+
+
+def lch_to_lab_array(L, C=None, H=None):
+    L, C, H = _channels(L, C, H)
+    H_rad = np.deg2rad(H)
+    a = np.cos(H_rad) * C
+    b = np.sin(H_rad) * C
+    return np.stack([L, a, b], axis=-1)
+
+
+# Inverse of the CIE f() companding, applied element-wise
+def _f_inv(t):
+    t3 = t ** 3
+    return np.where(t3 > 0.008856, t3, (t - 16 / 116) / 7.787)
+
+
+def lab_to_xyz_array(L, a=None, b=None):
+    L, a, b = _channels(L, a, b)
+    Y = (L + 16) / 116
+    X = a / 500 + Y
+    Z = Y - b / 200
+    return np.stack([REF_X * _f_inv(X), REF_Y * _f_inv(Y), REF_Z * _f_inv(Z)], axis=-1)
+
+
+# Linear RGB; values outside [0, 1] are out of the sRGB gamut and are clipped
+# unless clip=False
+def xyz_to_rgb_array(X, Y=None, Z=None, clip=True):
+    X, Y, Z = _channels(X, Y, Z)
+    X = X / 100
+    Y = Y / 100
+    Z = Z / 100
+
+    # Written out term by term so results match the scalar path exactly
+    R = X *  3.2406 + Y * -1.5372 + Z * -0.4986
+    G = X * -0.9689 + Y *  1.8758 + Z *  0.0415
+    B = X *  0.0557 + Y * -0.2040 + Z *  1.0570
+
+    rgb = np.stack([R, G, B], axis=-1)
+    return np.clip(rgb, 0, 1) if clip else rgb
+
+
+def lch_to_rgb_array(L, C=None, H=None, clip=True):
+    return xyz_to_rgb_array(lab_to_xyz_array(lch_to_lab_array(L, C, H)), clip=clip)
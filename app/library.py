@@ -0,0 +1,299 @@
+import argparse
+import bisect
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import neighbours
+
+# Persistent colour library: a directory of raw column files that is
+# memory-mapped on open, so a library of hundreds of thousands of readings
+# opens in milliseconds with nothing parsed. Layout:
+#
+#   meta.json                row count and label columns; rewritten last, so a
+#                            half-finished append is never seen
+#   L.f64 a.f64 b.f64 ...    one little-endian float64 file per numeric column
+#   Toner.codes              int32 label code per row
+#   Toner.names              label text per code, one JSON string per line
+#   Toner.index.npz          rank: position of each code in sorted name order,
+#                            rows: row numbers ordered by label name,
+#                            starts: where each name's rows start in rows
+#   append.lock              held while an append is running
+#
+# Appends only ever add to the column, code and name files, one at a time.
+# The index is rebuilt from the codes after each append (one argsort, no
+# parsing), replaced as a single file, and read in full on open, so an open
+# library keeps a consistent view while others append. It gives prefix lookup
+# by reference name in O(log names + matches).
+#
+#   python library.py colour_library master.csv [more.csv ...]
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "colour_library")
+COLUMNS = ('L', 'a', 'b', 'C', 'H')
+LABEL_COLUMNS = ('Toner', 'Source')
+VERSION = 1
+# An append lock older than this is taken to be left by a crashed process
+STALE_LOCK_SECONDS = 600
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _save_index(path, rank, rows, starts):
+    _write_atomic(path, lambda f: np.savez(f, rank=rank, rows=rows, starts=starts))
+
+
+# Holds the library's lock file while one process appends, waiting for any
+# other append to finish first
+class _AppendLock:
+
+    def __init__(self, path, timeout=60.0):
+        self.path = os.path.join(path, "append.lock")
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > STALE_LOCK_SECONDS:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Colour library at {os.path.dirname(self.path)} is busy with another append")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        os.remove(self.path)
+
+
+# Change stamp for a library on disk, e.g. to key a cache; None if there is none
+def stamp(path=DEFAULT_PATH):
+    try:
+        return os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ColourLibrary:
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No colour library at {path}")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != VERSION:
+            raise ValueError(f"Unsupported colour library version {meta.get('version')!r}")
+        self.rows = meta['rows']
+        self.labels = meta['labels']
+        self._columns = {col: self._map(f"{col}.f64", np.float64) for col in COLUMNS}
+        self._codes = {col: self._map(f"{col}.codes", np.int32) for col in self.labels}
+        # meta.json is written after the index, so the index read here covers
+        # at least self.rows rows; rows from a later append are filtered out
+        self._index = {}
+        for col in self.labels:
+            with np.load(self._file(f"{col}.index.npz")) as index:
+                self._index[col] = (index['rank'], index['rows'], index['starts'])
+        self._names = {}
+        self._sorted_names = {}
+
+    @classmethod
+    def create(cls, path=DEFAULT_PATH, labels=LABEL_COLUMNS):
+        os.makedirs(path, exist_ok=True)
+        with _AppendLock(path):
+            if os.path.exists(os.path.join(path, "meta.json")):
+                raise FileExistsError(f"A colour library already exists at {path}")
+            cls._initialise(path, labels)
+        return cls(path)
+
+    @classmethod
+    def _initialise(cls, path, labels):
+        for name in [f"{col}.f64" for col in COLUMNS] + [f"{col}.{ext}" for col in labels
+                                                          for ext in ("codes", "names")]:
+            open(os.path.join(path, name), "wb").close()
+        for col in labels:
+            _save_index(os.path.join(path, f"{col}.index.npz"), np.empty(0, dtype=np.int32),
+                        np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64))
+        cls._write_meta(path, 0, list(labels))
+
+    # Open the library at path, creating an empty one if there is none
+    @classmethod
+    def open(cls, path=DEFAULT_PATH, create=False):
+        if create and stamp(path) is None:
+            os.makedirs(path, exist_ok=True)
+            with _AppendLock(path):
+                # Another process may have created it while this one waited
+                if stamp(path) is None:
+                    cls._initialise(path, LABEL_COLUMNS)
+        return cls(path)
+
+    @staticmethod
+    def _write_meta(path, rows, labels):
+        meta = {'version': VERSION, 'rows': rows, 'labels': labels}
+        _write_atomic(os.path.join(path, "meta.json"), lambda f: f.write(json.dumps(meta).encode()))
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    # Read-only map of the first self.rows values of a column file
+    def _map(self, name, dtype):
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, col):
+        return self._columns[col]
+
+    # Label names by code, as many as the index read on open knows about; the
+    # names file only ever grows, so later names are simply not read
+    def names(self, col):
+        if col not in self._names:
+            count = len(self._index[col][0])
+            with open(self._file(f"{col}.names"), encoding="utf-8") as f:
+                self._names[col] = [json.loads(line) for line, _ in zip(f, range(count))]
+        return self._names[col]
+
+    # Names in sorted order, as the index sees them
+    def _sorted(self, col):
+        if col not in self._sorted_names:
+            order = np.argsort(self._index[col][0])
+            names = self.names(col)
+            self._sorted_names[col] = [names[i] for i in order]
+        return self._sorted_names[col]
+
+    # Row numbers whose label in col starts with prefix, in row order
+    def find_prefix(self, col, prefix):
+        if not prefix:
+            return np.arange(self.rows)
+        names = self._sorted(col)
+        lo = bisect.bisect_left(names, prefix)
+        hi = bisect.bisect_left(names, prefix + "\U0010ffff")
+        _, rows, starts = self._index[col]
+        found = np.sort(rows[starts[lo]:starts[hi]])
+        return found[found < self.rows]
+
+    # Rows matching every given label prefix, e.g. select(Toner="Cyan")
+    def select(self, **prefixes):
+        rows = None
+        for col, prefix in prefixes.items():
+            if not prefix:
+                continue
+            if col not in self.labels:
+                return np.empty(0, dtype=np.int64)
+            found = self.find_prefix(col, prefix)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        return np.arange(self.rows) if rows is None else rows
+
+    # Readings as a frame, for all rows or the given row numbers. Label
+    # columns are categorical over the library's names.
+    def frame(self, rows=None):
+        take = (lambda array: np.asarray(array)) if rows is None else (lambda array: array[rows])
+        data = {col: take(self._columns[col]) for col in COLUMNS}
+        for col in self.labels:
+            names = self.names(col)
+            data[col] = pd.Categorical.from_codes(take(self._codes[col]), categories=pd.Index(names))
+        return pd.DataFrame(data)
+
+    # Add readings from a frame with Lab or LCH columns and optional labels.
+    # Appends from other sessions or processes wait their turn. Returns the
+    # library reopened at its new size.
+    def append(self, df):
+        if ingest.colour_space_of(df.columns) is None:
+            raise ValueError("Readings need 'L', 'a' and 'b' columns (Lab) or 'L', 'C' and 'H' columns (LCH).")
+        if len(df) == 0:
+            return self
+        with _AppendLock(self.path):
+            # Reopened under the lock, so rows appended since this one was
+            # opened are kept
+            ColourLibrary(self.path)._append(df)
+        return ColourLibrary(self.path)
+
+    def _append(self, df):
+        if 'C' not in df.columns or 'H' not in df.columns:
+            df = ingest.add_lch_columns(df.copy())
+        lab = neighbours.lab_of(df)
+        values = {'L': lab[:, 0], 'a': lab[:, 1], 'b': lab[:, 2],
+                  'C': df['C'].to_numpy(np.float64), 'H': df['H'].to_numpy(np.float64)}
+
+        for col in COLUMNS:
+            self._append_bytes(f"{col}.f64", values[col].astype('<f8'), np.float64)
+        for col in self.labels:
+            labels = df[col].fillna("").astype(str) if col in df.columns else np.full(len(df), "")
+            self._append_labels(col, labels)
+
+        self._write_meta(self.path, self.rows + len(df), self.labels)
+
+    def _append_bytes(self, name, array, dtype):
+        with open(self._file(name), "r+b") as f:
+            # Drop anything past the committed rows left by an interrupted append
+            f.truncate(self.rows * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    def _append_labels(self, col, labels):
+        # Every name in the file, including any left by an interrupted append,
+        # so they are reused below rather than repeated; a cut-off last line is
+        # dropped
+        with open(self._file(f"{col}.names"), "r+b") as f:
+            text = f.read()
+            f.truncate(text.rfind(b"\n") + 1)
+        names = [json.loads(line) for line in text[:text.rfind(b"\n") + 1].decode("utf-8").splitlines()]
+        known = {name: code for code, name in enumerate(names)}
+        local, uniques = pd.factorize(labels)
+        new = [name for name in uniques if name not in known]
+        for name in new:
+            known[name] = len(names)
+            names.append(name)
+        codes = np.array([known[name] for name in uniques], dtype=np.int32)[local]
+
+        with open(self._file(f"{col}.names"), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(name) + "\n" for name in new)
+        self._append_bytes(f"{col}.codes", codes.astype('<i4'), np.int32)
+
+        # Rebuild the name index over every row's code
+        all_codes = np.fromfile(self._file(f"{col}.codes"), dtype=np.int32)
+        rank = np.empty(len(names), dtype=np.int32)
+        rank[np.argsort(np.array(names, dtype=object), kind='stable')] = np.arange(len(names))
+        row_ranks = rank[all_codes]
+        _save_index(self._file(f"{col}.index.npz"), rank,
+                    np.argsort(row_ranks, kind='stable').astype(np.int64),
+                    np.concatenate([[0], np.cumsum(np.bincount(row_ranks, minlength=len(names)))]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or add to a colour library from CSV, Parquet or "
+                                                 "Arrow files of Lab/LCH readings.")
+    parser.add_argument("library", help="library directory (created if missing)")
+    parser.add_argument("inputs", nargs="+", help="files to append")
+    args = parser.parse_args(argv)
+
+    library = ColourLibrary.open(args.library, create=True)
+    for path in args.inputs:
+        with open(path, "rb") as f:
+            df = ingest.read_colour_file(f, path)
+        library = library.append(df)
+        print(f"{path}: {len(df):,} readings, library now {len(library):,}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+# Level-of-detail reduction for the polar chart. Points are binned on a C/H
+# grid and each occupied bin is drawn as one marker carrying its count, so the
+# payload sent to the browser depends on the number of bins, not readings.
+# The density views do the same with plain counts per C/H bin or L/C/H voxel.
+
+DEFAULT_BUDGET_BYTES = 2_000_000
+
+
+# Evenly spaced rows of df, at most n of them
+def sample_rows(df, n):
+    if len(df) <= n:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, n).astype(np.intp)]
+
+
+# Payload of a chart per point, per colour group (each is its own trace) and
+# fixed (layout), fitted from the JSON size of the charts measure(sample)
+# builds for three samples: a small and a large one from the largest group,
+# and one reading from each of up to `small` groups. Keeping the point samples
+# to one group stops the trace overhead being counted per point when almost
+# every reading in a sample is a new group. Measuring the real figure covers
+# everything it carries per point: hover data, text and marker settings as
+# well as the coordinates.
+def payload_cost(df, measure, by=None, small=50, large=250):
+    if len(df) == 0:
+        return 0.0, 0.0, 0.0
+    if by is not None and by in df.columns:
+        codes = pd.factorize(df[by], use_na_sentinel=False)[0]
+    else:
+        codes = np.zeros(len(df), dtype=np.intp)
+    largest = df[codes == np.bincount(codes).argmax()]
+    large_n = min(large, len(largest))
+    small_n = max(1, min(small, large_n // 2))
+    small_bytes = measure(sample_rows(largest, small_n))
+
+    # First reading of each group, in the order the groups appear
+    firsts = np.sort(np.unique(codes, return_index=True)[1])[:small]
+    n_groups = len(firsts)
+    group_bytes = measure(df.iloc[firsts]) if n_groups > 1 else small_bytes
+
+    if large_n > small_n:
+        per_point = max((measure(sample_rows(largest, large_n)) - small_bytes) / (large_n - small_n), 1.0)
+        per_group = 0.0
+        if n_groups > 1:
+            per_group = max((group_bytes - small_bytes - per_point * (n_groups - small_n)) / (n_groups - 1), 0.0)
+    elif n_groups > 1:
+        # Groups of one reading each: points and traces can't be told apart
+        per_point = max((group_bytes - small_bytes) / (n_groups - 1), 1.0)
+        per_group = 0.0
+    else:
+        return small_bytes / small_n, 0.0, 0.0
+    return per_point, per_group, max(small_bytes - per_point * small_n - per_group, 0.0)
+
+
+# Number of points that fit in a payload budget
+def point_budget(per_point, fixed=0.0, budget_bytes=DEFAULT_BUDGET_BYTES):
+    if per_point == 0:
+        return np.inf
+    return max(1, int((budget_bytes - fixed) // per_point))
+
+
+# Rows of df with a finite value in every one of columns. Readings with a
+# blank cell would otherwise land in a bin with a negative index.
+def finite_rows(df, columns=('L', 'C', 'H')):
+    keep = np.ones(len(df), dtype=bool)
+    for column in columns:
+        keep &= np.isfinite(df[column].to_numpy(dtype=np.float64))
+    return df if keep.all() else df[keep]
+
+
+# Keep only readings inside a C and H window. The hue window may wrap past 360.
+def select_region(df, c_range=(0, 130), h_range=(0, 360)):
+    C = df['C'].to_numpy()
+    H = df['H'].to_numpy()
+    in_c = (C >= c_range[0]) & (C <= c_range[1])
+    h0, h1 = h_range
+    if h1 - h0 >= 360:
+        in_h = np.ones(len(df), dtype=bool)
+    elif h0 <= h1:
+        in_h = (H >= h0) & (H <= h1)
+    else:
+        in_h = (H >= h0) | (H <= h1)
+    return df[in_c & in_h]
+
+
+# Bin of each reading on a c_step x h_step polar grid, one set of bins per
+# group code if groups is given (a code of -1, a missing group, gets its own)
+def _bin_keys(C, H, c_step, h_step, groups=None, n_groups=0):
+    n_h = int(np.ceil(360 / h_step))
+    key = np.floor(C / c_step).astype(np.int64) * n_h + np.floor(H / h_step).astype(np.int64)
+    if groups is not None:
+        key = key * (n_groups + 1) + groups
+    return key
+
+
+# Bin readings on a c_step x h_step polar grid, grouped by `by` if given.
+# Each bin reports mean L and C, circular mean H, the count and the label of
+# its first reading.
+def bin_polar(df, c_step=5.0, h_step=5.0, by=None, label="Toner"):
+    df = finite_rows(df)
+    C = df['C'].to_numpy(dtype=np.float64)
+    H = df['H'].to_numpy(dtype=np.float64) % 360
+    L = df['L'].to_numpy(dtype=np.float64)
+
+    groups, group_names = (None, ()) if by is None or by not in df.columns else pd.factorize(df[by])
+    key = _bin_keys(C, H, c_step, h_step, groups, len(group_names))
+
+    bins, first, inverse, counts = np.unique(key, return_index=True, return_inverse=True,
+                                             return_counts=True)
+    h_rad = np.deg2rad(H)
+    sin_sum = np.bincount(inverse, weights=np.sin(h_rad))
+    cos_sum = np.bincount(inverse, weights=np.cos(h_rad))
+
+    out = pd.DataFrame({
+        'L': np.bincount(inverse, weights=L) / counts,
+        'C': np.bincount(inverse, weights=C) / counts,
+        'H': np.degrees(np.arctan2(sin_sum, cos_sum)) % 360,
+        'count': counts,
+    })
+    if by is not None and by in df.columns:
+        out[by] = df[by].to_numpy()[first]
+    if label in df.columns:
+        out[label] = df[label].to_numpy()[first]
+    return out
+
+
+# Bin with the finest grid that keeps the number of markers within max_points.
+# One axis is coarsened at a time, doubling the bin size of whichever has more
+# bins across the data, until it fits or both span the whole range. Only the
+# occupied bins are counted while searching; the chosen grid is binned once.
+def bin_to_budget(df, max_points, c_step=1.0, h_step=1.0, by=None, label="Toner"):
+    finite = finite_rows(df)
+    C = finite['C'].to_numpy(dtype=np.float64)
+    H = finite['H'].to_numpy(dtype=np.float64) % 360
+    groups, group_names = (None, ()) if by is None or by not in df.columns else pd.factorize(finite[by])
+    c_span = max(float(C.max()) if len(C) else 0.0, 1.0)
+
+    def n_bins():
+        return len(np.unique(_bin_keys(C, H, c_step, h_step, groups, len(group_names))))
+
+    while (h_step < 360 or c_step < c_span) and n_bins() > max_points:
+        if c_step >= c_span or (h_step < 360 and 360 / h_step >= c_span / c_step):
+            h_step = min(h_step * 2, 360.0)
+        else:
+            c_step *= 2
+    return bin_polar(finite, c_step, h_step, by=by, label=label), (c_step, h_step)
+
+
+# Keep only readings with L inside l_range; None keeps them all
+def select_lightness(df, l_range=None):
+    if l_range is None:
+        return df
+    L = df['L'].to_numpy()
+    return df[(L >= l_range[0]) & (L <= l_range[1])]
+
+
+# Reading counts on a c_step x h_step polar grid, computed with one bincount.
+# Returns the occupied bins only, as inner chroma C0, start hue H0 and count.
+def polar_histogram(df, c_step=5.0, h_step=5.0):
+    df = finite_rows(df, ('C', 'H'))
+    n_h = int(np.ceil(360 / h_step))
+    c_bin = np.floor(df['C'].to_numpy(dtype=np.float64) / c_step).astype(np.int64)
+    h_bin = np.minimum(np.floor(df['H'].to_numpy(dtype=np.float64) % 360 / h_step).astype(np.int64), n_h - 1)
+    if len(c_bin) == 0:
+        return pd.DataFrame({'C0': [], 'H0': [], 'count': np.empty(0, dtype=np.int64)})
+
+    counts = np.bincount(c_bin * n_h + h_bin)
+    bins = np.flatnonzero(counts)
+    return pd.DataFrame({'C0': bins // n_h * c_step, 'H0': bins % n_h * h_step, 'count': counts[bins]})
+
+
+# Reading counts on an l_step x c_step x h_step grid. Returns the occupied
+# voxels only, with L, C and H at the voxel centres and the count.
+def voxel_density(df, l_step=5.0, c_step=5.0, h_step=10.0):
+    df = finite_rows(df)
+    n_h = int(np.ceil(360 / h_step))
+    l_bin = np.floor(np.clip(df['L'].to_numpy(dtype=np.float64), 0, None) / l_step).astype(np.int64)
+    c_bin = np.floor(df['C'].to_numpy(dtype=np.float64) / c_step).astype(np.int64)
+    h_bin = np.minimum(np.floor(df['H'].to_numpy(dtype=np.float64) % 360 / h_step).astype(np.int64), n_h - 1)
+    if len(l_bin) == 0:
+        return pd.DataFrame({'L': [], 'C': [], 'H': [], 'count': np.empty(0, dtype=np.int64)})
+
+    n_c = int(c_bin.max()) + 1
+    counts = np.bincount((l_bin * n_c + c_bin) * n_h + h_bin)
+    bins = np.flatnonzero(counts)
+    return pd.DataFrame({
+        'L': (bins // (n_c * n_h) + 0.5) * l_step,
+        'C': (bins // n_h % n_c + 0.5) * c_step,
+        'H': (bins % n_h + 0.5) * h_step,
+        'count': counts[bins],
+    })
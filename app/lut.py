@@ -0,0 +1,124 @@
+import os
+import uuid
+
+import numpy as np
+
+import lch_convert as lc
+
+# Optional lookup-table backend for LCH -> sRGB. A quantised grid over
+# L in [0,100], C in [0,130], H in [0,360) is built once with the exact
+# conversion, saved to disk and memory-mapped on later starts. Queries are
+# answered by trilinear interpolation; hue wraps around 360.
+#
+# With the default 101 x 131 x 361 grid (1 unit steps, ~57 MB as float32) the
+# max abs error against lch_convert.lch_to_rgb_array is about 0.013 on the 0-1
+# RGB scale (~3/255), found next to the gamut clamp; the mean error is ~4e-5.
+# Run `python bench.py` to measure it. Note that the eight corner gathers cost
+# more than the exact vectorised maths in NumPy (~0.5s vs ~0.16s per 1M points
+# on a dev machine), so the exact path stays the default.
+
+L_RANGE = (0.0, 100.0)
+C_RANGE = (0.0, 130.0)
+H_RANGE = (0.0, 360.0)
+DEFAULT_SHAPE = (101, 131, 361)
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lch_rgb_lut.npy")
+
+_tables = {}
+
+
+def build_lut(shape=DEFAULT_SHAPE):
+    L = np.linspace(*L_RANGE, shape[0])
+    C = np.linspace(*C_RANGE, shape[1])
+    H = np.linspace(*H_RANGE, shape[2])
+    grid = np.stack(np.meshgrid(L, C, H, indexing='ij'), axis=-1)
+    return lc.lch_to_rgb_array(grid.reshape(-1, 3)).reshape(*shape, 3).astype(np.float32)
+
+
+# Load the table from disk, building and saving it first if needed. Tables are
+# memory-mapped read-only and shared by every caller in the process.
+def load_lut(path=DEFAULT_PATH, shape=DEFAULT_SHAPE):
+    key = (path, tuple(shape))
+    if key in _tables:
+        return _tables[key]
+
+    table = None
+    if os.path.exists(path):
+        try:
+            table = np.load(path, mmap_mode='r')
+        except (OSError, ValueError, EOFError):
+            table = None
+        if table is not None and table.shape != (*shape, 3):
+            table = None
+    if table is None:
+        table = build_lut(shape)
+        try:
+            # Written under a temporary name so another process building the
+            # same table never maps half a file
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, table)
+            os.replace(tmp, path)
+            table = np.load(path, mmap_mode='r')
+        except OSError:
+            # A read-only install still works, with the table held in memory
+            pass
+
+    _tables[key] = table
+    return table
+
+
+# Fractional grid position and the two neighbouring indices along one axis
+def _axis(values, lo, hi, n, wrap=False):
+    step = (hi - lo) / (n - 1)
+    pos = (values - lo) / step
+    if wrap:
+        # The last hue sample (360) duplicates the first (0)
+        pos = np.mod(pos, n - 1)
+    else:
+        pos = np.clip(pos, 0, n - 1)
+    i0 = np.minimum(np.floor(pos).astype(np.intp), n - 2)
+    return i0, i0 + 1, (pos - i0)[:, None]
+
+
+# LCH -> RGB through the lookup table. Same call signature as
+# lch_convert.lch_to_rgb_array; values outside the table's L/C range are clamped.
+def lch_to_rgb_lut(L, C=None, H=None, table=None):
+    if table is None:
+        table = load_lut()
+    L, C, H = lc._channels(L, C, H)
+    shape = L.shape
+    L, C, H = L.ravel(), C.ravel(), H.ravel()
+    nL, nC, nH = table.shape[:3]
+    # Readings with a blank value are looked up at 0 and come back as NaN, as
+    # from the exact conversion
+    missing = ~(np.isfinite(L) & np.isfinite(C) & np.isfinite(H))
+    if missing.any():
+        L, C, H = (np.where(missing, 0.0, x) for x in (L, C, H))
+
+    l0, l1, fl = _axis(L, *L_RANGE, nL)
+    c0, c1, fc = _axis(C, *C_RANGE, nC)
+    h0, h1, fh = _axis(H, *H_RANGE, nH, wrap=True)
+
+    # Gather the eight surrounding corners by flat index and blend them with
+    # trilinear weights; flat np.take is much faster than 3D fancy indexing
+    flat = table.reshape(-1, 3)
+    rgb = np.zeros((len(L), 3), dtype=np.float64)
+    for li, wl in ((l0, 1 - fl), (l1, fl)):
+        for ci, wc in ((c0, 1 - fc), (c1, fc)):
+            base = (li * nC + ci) * nH
+            wlc = wl * wc
+            rgb += np.take(flat, base + h0, axis=0) * (wlc * (1 - fh))
+            rgb += np.take(flat, base + h1, axis=0) * (wlc * fh)
+
+    rgb[missing] = np.nan
+    return rgb.reshape(*shape, 3)
+
+
+# Largest difference between the table and the exact conversion on random inputs
+def max_error(n=1_000_000, table=None, seed=0):
+    rng = np.random.default_rng(seed)
+    L = rng.uniform(*L_RANGE, n)
+    C = rng.uniform(*C_RANGE, n)
+    H = rng.uniform(*H_RANGE, n)
+    diff = np.abs(lch_to_rgb_lut(L, C, H, table=table) - lc.lch_to_rgb_array(L, C, H))
+    return float(diff.max()), float(diff.mean())
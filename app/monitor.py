@@ -0,0 +1,276 @@
+import io
+import os
+import re
+import socket
+
+import numpy as np
+import pandas as pd
+
+import delta_e
+import ingest
+import lch_convert as lc
+import neighbours
+
+# Live monitoring of readings logged on press. A feed (a CSV file that keeps
+# growing, or a local socket sending CSV lines) is polled for new rows, which
+# go into a fixed-size ring buffer for plotting and update per-toner running
+# statistics. Each reading costs O(1) whatever the history: nothing is
+# recomputed over old rows, and memory stays at the ring buffer's capacity.
+
+DEFAULT_CAPACITY = 50_000
+# Weight of each new reading in the rolling means (exponentially weighted)
+DEFAULT_ALPHA = 0.05
+# Readings per toner averaged into the reference its drift is measured from
+BASELINE_READINGS = 20
+# Most bytes taken from a feed per poll, so a backlog can't stall a refresh
+MAX_READ_BYTES = 4_000_000
+
+
+# Turns chunks of a CSV byte stream into frames of complete rows. The first
+# line is the header; a trailing partial line waits for the next chunk.
+class _CsvLines:
+
+    def __init__(self):
+        self.header = None
+        self._partial = b""
+
+    def feed(self, data):
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        lines = data[:end]
+        if self.header is None and lines:
+            first = lines.index(b"\n") + 1
+            self.header, lines = lines[:first], lines[first:]
+        if not lines.strip():
+            return None
+        return ingest.read_colour_csv(io.BytesIO(self.header + lines))
+
+
+# Follows a CSV file as rows are appended. Starts from the first row, or from
+# the current end of the file if from_start is False. A file that shrinks is
+# taken to have been replaced and is read again from the top.
+class CsvTail:
+
+    def __init__(self, path, from_start=True):
+        self.path = path
+        self._lines = _CsvLines()
+        self._offset = 0
+        if not from_start:
+            with open(path, "rb") as f:
+                self._lines.feed(f.readline())
+                self._offset = os.path.getsize(path)
+
+    def poll(self):
+        size = os.path.getsize(self.path)
+        if size < self._offset:
+            self._lines = _CsvLines()
+            self._offset = 0
+        if size == self._offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(MAX_READ_BYTES)
+        self._offset += len(data)
+        return self._lines.feed(data)
+
+    def close(self):
+        pass
+
+
+# Reads CSV lines from a TCP feed, header first, without blocking the app
+class SocketFeed:
+
+    def __init__(self, host, port, timeout=2.0):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setblocking(False)
+        self._lines = _CsvLines()
+        self.closed = False
+
+    def poll(self):
+        chunks = []
+        received = 0
+        while not self.closed and received < MAX_READ_BYTES:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                break
+            if not data:
+                self.close()
+                break
+            chunks.append(data)
+            received += len(data)
+        if not chunks:
+            return None
+        return self._lines.feed(b"".join(chunks))
+
+    def close(self):
+        if not self.closed:
+            self._sock.close()
+            self.closed = True
+
+
+# A feed for "host:port", or for a CSV path otherwise
+def open_feed(source, from_start=True):
+    match = re.fullmatch(r"([\w.-]+):(\d+)", source.strip())
+    if match and not os.path.exists(source):
+        return SocketFeed(match.group(1), int(match.group(2)))
+    return CsvTail(source, from_start=from_start)
+
+
+# The most recent `capacity` readings, held in preallocated arrays that are
+# overwritten oldest first
+class RingBuffer:
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._L = np.empty(capacity, dtype=np.float64)
+        self._C = np.empty(capacity, dtype=np.float64)
+        self._H = np.empty(capacity, dtype=np.float64)
+        self._codes = np.empty(capacity, dtype=np.int32)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, L, C, H, codes):
+        n = len(L)
+        if n > self.capacity:
+            L, C, H, codes = L[-self.capacity:], C[-self.capacity:], H[-self.capacity:], codes[-self.capacity:]
+            n = self.capacity
+        slots = (self._next + np.arange(n)) % self.capacity
+        self._L[slots] = L
+        self._C[slots] = C
+        self._H[slots] = H
+        self._codes[slots] = codes
+        self._next = (self._next + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    # Slot order from oldest to newest reading
+    def _order(self):
+        if self._size < self.capacity:
+            return np.arange(self._size)
+        return (self._next + np.arange(self.capacity)) % self.capacity
+
+    def arrays(self):
+        order = self._order()
+        return self._L[order], self._C[order], self._H[order], self._codes[order]
+
+
+# Per-toner running statistics, updated a chunk at a time. Each toner keeps an
+# exponentially weighted mean of its Lab readings (the rolling mean) and the
+# mean of its first baseline_readings readings (the reference). Drift is the
+# Delta E between the two. Means are taken in Lab, so hue averages correctly
+# across 0/360.
+class DriftStats:
+
+    def __init__(self, alpha=DEFAULT_ALPHA, baseline_readings=BASELINE_READINGS):
+        self.alpha = alpha
+        self.baseline_readings = baseline_readings
+        self._count = np.zeros(0, dtype=np.int64)
+        self._base_sum = np.zeros((0, 3))
+        self._base_n = np.zeros(0, dtype=np.int64)
+        self._ew_sum = np.zeros((0, 3))
+        self._ew_weight = np.zeros(0)
+
+    def _reserve(self, n_codes):
+        extra = n_codes - len(self._count)
+        if extra > 0:
+            self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+            self._base_sum = np.vstack([self._base_sum, np.zeros((extra, 3))])
+            self._base_n = np.concatenate([self._base_n, np.zeros(extra, dtype=np.int64)])
+            self._ew_sum = np.vstack([self._ew_sum, np.zeros((extra, 3))])
+            self._ew_weight = np.concatenate([self._ew_weight, np.zeros(extra)])
+
+    # Fold in readings `lab` (N,3) for toner `codes` (N,), in arrival order
+    def update(self, codes, lab):
+        if len(codes) == 0:
+            return
+        self._reserve(int(codes.max()) + 1)
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        lab = np.asarray(lab, dtype=np.float64)[order]
+        toners, start, counts = np.unique(codes, return_index=True, return_counts=True)
+        rank = np.arange(len(codes)) - np.repeat(start, counts)
+
+        # A toner's k new readings decay its old sums by (1 - alpha)^k and add
+        # themselves with weights (1 - alpha)^(k - 1 - rank)
+        keep = 1.0 - self.alpha
+        weights = keep ** (np.repeat(counts, counts) - 1 - rank)
+        decay = keep ** counts
+        self._ew_sum[toners] = (self._ew_sum[toners] * decay[:, None]
+                                + np.add.reduceat(lab * weights[:, None], start))
+        self._ew_weight[toners] = self._ew_weight[toners] * decay + np.add.reduceat(weights, start)
+
+        in_baseline = (self._count[codes] + rank) < self.baseline_readings
+        self._base_sum[toners] += np.add.reduceat(lab * in_baseline[:, None], start)
+        self._base_n[toners] += np.add.reduceat(in_baseline.astype(np.int64), start)
+        self._count[toners] += counts
+
+    # One row per toner: readings seen, rolling mean L/C/H and drift from the
+    # baseline
+    def table(self, labels, metric="CIEDE2000"):
+        seen = np.flatnonzero(self._count)
+        if len(seen) == 0:
+            return pd.DataFrame(columns=['Toner', 'Readings', 'L', 'C', 'H', f'Drift dE {metric}'])
+        rolling = self._ew_sum[seen] / self._ew_weight[seen, None]
+        baseline = self._base_sum[seen] / self._base_n[seen, None]
+        lch = lc.lab_to_lch_array(rolling)
+        return pd.DataFrame({
+            'Toner': [labels[i] for i in seen],
+            'Readings': self._count[seen],
+            'L': lch[:, 0],
+            'C': lch[:, 1],
+            'H': lch[:, 2],
+            f'Drift dE {metric}': delta_e.METRICS[metric](baseline, rolling),
+        })
+
+
+class Monitor:
+
+    def __init__(self, feed, capacity=DEFAULT_CAPACITY, alpha=DEFAULT_ALPHA,
+                 baseline_readings=BASELINE_READINGS):
+        self.feed = feed
+        self.buffer = RingBuffer(capacity)
+        self.stats = DriftStats(alpha, baseline_readings)
+        self._labels = []
+        self._label_codes = {}
+        self.received = 0
+        # Changes whenever new readings arrive, so it can key cached figures
+        self.version = 0
+
+    def _intern(self, label):
+        code = self._label_codes.get(label)
+        if code is None:
+            code = len(self._labels)
+            self._labels.append(label)
+            self._label_codes[label] = code
+        return code
+
+    # Take any new rows from the feed; returns how many arrived
+    def poll(self):
+        chunk = self.feed.poll()
+        if chunk is None or chunk.empty:
+            return 0
+        labels = chunk['Toner'].fillna("").astype(str) if 'Toner' in chunk.columns else np.full(len(chunk), "")
+        local, names = pd.factorize(labels)
+        codes = np.array([self._intern(name) for name in names], dtype=np.int32)[local]
+        self.buffer.extend(chunk['L'].to_numpy(np.float64), chunk['C'].to_numpy(np.float64),
+                           chunk['H'].to_numpy(np.float64), codes)
+        self.stats.update(codes, neighbours.lab_of(chunk))
+        self.received += len(chunk)
+        self.version += 1
+        return len(chunk)
+
+    # The readings in the ring buffer, oldest first
+    def frame(self):
+        L, C, H, codes = self.buffer.arrays()
+        toner = pd.Categorical.from_codes(codes, categories=self._labels) if len(codes) else []
+        return pd.DataFrame({'L': L, 'C': C, 'H': H, 'Toner': toner})
+
+    def drift(self, metric="CIEDE2000"):
+        return self.stats.table(self._labels, metric)
+
+    def close(self):
+        self.feed.close()
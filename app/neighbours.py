@@ -0,0 +1,66 @@
+import numpy as np
+
+import delta_e
+import lch_convert as lc
+
+# Nearest-colour search over loaded readings. A KD-tree over Lab answers CIE76
+# queries exactly, since CIE76 is Euclidean distance in Lab. CIEDE2000 is not a
+# Euclidean metric, so it is answered by taking a larger pool of Lab neighbours
+# from the tree and re-ranking that pool with the exact formula.
+
+# How many tree neighbours to consider per requested CIEDE2000 match
+CANDIDATE_FACTOR = 20
+MIN_CANDIDATES = 200
+
+
+# Lab array for a frame that has either a/b or C/H columns
+def lab_of(df):
+    if 'a' in df.columns and 'b' in df.columns:
+        return np.column_stack([df['L'].to_numpy(np.float64), df['a'].to_numpy(np.float64),
+                                df['b'].to_numpy(np.float64)])
+    return lc.lch_to_lab_array(df['L'].to_numpy(), df['C'].to_numpy(), df['H'].to_numpy())
+
+
+class ColourIndex:
+
+    def __init__(self, lab):
+        # scipy is only needed once readings are loaded, so it is imported here
+        from scipy.spatial import cKDTree
+        lab = np.asarray(lab, dtype=np.float64)
+        # Readings with a blank L, a or b can't be placed in the tree; rows
+        # holds the original position of each reading that is
+        self.rows = np.flatnonzero(np.isfinite(lab).all(axis=1))
+        self.lab = np.ascontiguousarray(lab[self.rows])
+        self.tree = cKDTree(self.lab)
+
+    def __len__(self):
+        return len(self.lab)
+
+    # Row positions (in the array the index was built from) and Delta E of the
+    # k readings closest to a Lab target
+    def query(self, target, k=5, metric="CIE76"):
+        target = np.asarray(target, dtype=np.float64)
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        if metric == "CIE76":
+            dist, idx = self.tree.query(target, k=k)
+            return self.rows[np.atleast_1d(idx)], np.atleast_1d(dist)
+
+        pool = min(len(self), max(k * CANDIDATE_FACTOR, MIN_CANDIDATES))
+        _, idx = self.tree.query(target, k=pool)
+        idx = np.atleast_1d(idx)
+        dist = delta_e.METRICS[metric](target, self.lab[idx])
+        order = np.argsort(dist, kind='stable')[:k]
+        return self.rows[idx[order]], dist[order]
+
+
+# The k readings in df closest to a Lab target, with a Delta E column
+def nearest_colours(df, target_lab, k=5, metric="CIE76", index=None):
+    if index is None:
+        index = ColourIndex(lab_of(df))
+    idx, dist = index.query(target_lab, k=k, metric=metric)
+    result = df.iloc[idx].copy()
+    result.insert(0, f'dE {metric}', dist)
+    return result.reset_index(drop=True)
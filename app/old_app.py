@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
+import ingest
+import wheel
 from PIL import Image  # Import Image module from PIL library
 
 
@@ -50,12 +52,12 @@ if st.sidebar.button("Add value"):
 data_file = st.sidebar.file_uploader("Load in the CSV file...")
 
 if data_file is not None:
-    df = pd.read_csv(data_file)
-    if 'L' in df.columns and 'a' in df.columns and 'b' in df.columns:
-        # Convert Lab values to LCH
-        df[['L', 'C', 'H']] = df.apply(lab_to_lch, axis=1, result_type='expand')
-    else:
-        st.error("CSV must contain 'L', 'a', and 'b' columns for Lab color space.")
+    try:
+        # Read Lab or LCH columns and convert to LCH column-wise
+        df = ingest.read_colour_csv(data_file)
+    except ValueError as e:
+        st.error(str(e))
+        df = pd.DataFrame()
 else:
     # If no file uploaded yet, use accumulated data
     df = pd.DataFrame(st.session_state.data_list)
@@ -76,12 +78,15 @@ if not df.empty:
         0.0, 1.0, (1.0)) 
 
 
+        # LCH files may not carry a Toner label column
+        text_col = "Toner" if "Toner" in df.columns else None
+
         # Check if "source" column is present in the DataFrame
         if "Source" in df.columns:
-            fig = px.scatter_polar(df, r="C", theta="H", color="Source", direction='counterclockwise', start_angle= -23, text="Toner", height=600,
+            fig = px.scatter_polar(df, r="C", theta="H", color="Source", direction='counterclockwise', start_angle= -23, text=text_col, height=600,
                                 hover_data=df.columns, range_r=[0, 130])
         else:
-            fig = px.scatter_polar(df, r="C", theta="H", direction='counterclockwise', start_angle=-23, text="Toner", height=600,
+            fig = px.scatter_polar(df, r="C", theta="H", direction='counterclockwise', start_angle=-23, text=text_col, height=600,
                            hover_data=df.columns, range_r=[0, 130])
         
         fig.update_layout ( 
@@ -103,21 +108,11 @@ if not df.empty:
             radialaxis=dict(showticklabels=show_scale, visible= show_scale)),
             hoverlabel=dict(bgcolor="white", font_size=16, font_family="Rockwell"),
 
-        #grab a LCH background image from the web
-        images= [dict(
-                    #source="https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcTEwJBlL0BSeVPaLCBKFk15vf-LKej1Kvx5yQ&usqp=CAU",
-                    source="https://iili.io/JUVtZog.png",
-                    xref="paper", yref="paper",
-                    x=0.503, y=0.503,
-                    sizex= 1.0, sizey=1.13,
-                    xanchor="center",
-                    yanchor="middle",
-                    sizing="contain",
-                    layer="below")], 
+        # Hue wheel drawn from the LCH maths, cached and sent inline
+        images=[wheel.wheel_image(opacity=opacity)], 
                     margin=dict(l=50, r=50, t=50, b=50))
 
         #update the image and grid
-        fig.update_layout_images(opacity = opacity )
         fig.update_traces(marker=dict(size=10))
         fig.update_traces(textposition='top left')  # Adjust marker size as needed
     
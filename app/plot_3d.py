@@ -1,75 +1,55 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import instrument
+import lch_convert as lc
 
 def lch_to_lab(L, C, H):
-    H_rad = np.deg2rad(H)
-    a = np.cos(H_rad) * C
-    b = np.sin(H_rad) * C
-    return np.array([L, a, b])
+    return lc.lch_to_lab_array(L, C, H)
 
 def lab_to_xyz(L, a, b):
-    ref_X = 95.047
-    ref_Y = 100.000
-    ref_Z = 108.883
-
-    Y = (L + 16) / 116
-    X = a / 500 + Y
-    Z = Y - b / 200
-
-    X = ref_X * ((X ** 3) if (X ** 3 > 0.008856) else ((X - 16 / 116) / 7.787))
-    Y = ref_Y * ((Y ** 3) if (Y ** 3 > 0.008856) else ((Y - 16 / 116) / 7.787))
-    Z = ref_Z * ((Z ** 3) if (Z ** 3 > 0.008856) else ((Z - 16 / 116) / 7.787))
-
-    return np.array([X, Y, Z])
+    return lc.lab_to_xyz_array(L, a, b)
 
 def xyz_to_rgb(X, Y, Z):
-    X /= 100
-    Y /= 100
-    Z /= 100
-
-    R = X *  3.2406 + Y * -1.5372 + Z * -0.4986
-    G = X * -0.9689 + Y *  1.8758 + Z *  0.0415
-    B = X *  0.0557 + Y * -0.2040 + Z *  1.0570
-
-    R = 1 if R > 1 else 0 if R < 0 else R
-    G = 1 if G > 1 else 0 if G < 0 else G
-    B = 1 if B > 1 else 0 if B < 0 else B
-
-    return np.array([R, G, B])
-
-def plot_lch_colors(L_values, C_values, H_values):
-    points = []
-    colors = []
-
-    for L, C, H in zip(L_values, C_values, H_values):
-        lab = lch_to_lab(L, C, H)
-        xyz = lab_to_xyz(*lab)
-        rgb = xyz_to_rgb(*xyz)
+    return lc.xyz_to_rgb_array(X, Y, Z)
+
+@instrument.timed()
+def plot_lch_colors(L_values, C_values, H_values, backend="exact"):
+    # Convert the whole batch at once rather than point by point
+    points = np.column_stack([np.asarray(L_values, dtype=np.float64),
+                              np.asarray(C_values, dtype=np.float64),
+                              np.asarray(H_values, dtype=np.float64)]).reshape(-1, 3)
+    if backend == "lut":
+        # Interpolated lookup table, see lut.py for its error bound
+        import lut
+        colors = lut.lch_to_rgb_lut(points)
+    else:
+        colors = lc.lch_to_rgb_array(points)
+
+    instrument.count("points_coloured", len(points))
+    return (points, colors)
 
-        points.append((L, C, H))
-        colors.append(rgb)
 
-    points = np.array(points)
-    colors = np.array(colors)
+# Render the points from plot_lch_colors to a static image file. path may be a
+# file object, with format giving the image type (e.g. "png" or "svg").
+def save_lch_plot(points, colors, path, marker_size=100, format=None, rasterized=False):
+    # Imported here so the app and batch CSV conversion never load matplotlib.
+    # A bare Figure keeps no pyplot state, so it is safe from server threads.
+    from matplotlib.figure import Figure
 
-    return (points, colors)
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot(111, projection='3d')
 
+    ax.scatter(points[:, 1], points[:, 2], points[:, 0], c=colors, s=marker_size, rasterized=rasterized)
 
-#    fig = plt.figure(figsize=(10, 10))
-#    ax = fig.add_subplot(111, projection='3d')
-#
-#    ax.scatter(points[:, 1], points[:, 2], points[:, 0], c=colors, s=100)
-#
-#    ax.set_xlabel('Chroma (C)')
-#    ax.set_ylabel('Hue (H)')
-#    ax.set_zlabel('Lightness (L)')
-#    ax.set_title('Combined LCH Chromacity Plot')
+    ax.set_xlabel('Chroma (C)')
+    ax.set_ylabel('Hue (H)')
+    ax.set_zlabel('Lightness (L)')
+    ax.set_title('Combined LCH Chromacity Plot')
 
-#    ax.set_xlim(0, 120)
-#    ax.set_ylim(0, 360)
-#    ax.set_zlim(0, 100)
+    ax.set_xlim(0, 120)
+    ax.set_ylim(0, 360)
+    ax.set_zlim(0, 100)
 
-#    plt.show()
+    fig.savefig(path, format=format)
 
 if __name__ == "__main__":
     L_values = [80]
@@ -0,0 +1,112 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Store for readings added by hand in the app. L/C/H live in NumPy arrays that
+# grow by doubling, so appends are amortised O(1), and reference labels are
+# interned as integer codes. frame() wraps the filled part of the arrays without
+# copying them.
+
+
+class ColourStore:
+
+    def __init__(self, capacity=64):
+        self._L = np.empty(capacity, dtype=np.float64)
+        self._C = np.empty(capacity, dtype=np.float64)
+        self._H = np.empty(capacity, dtype=np.float64)
+        self._codes = np.empty(capacity, dtype=np.int32)
+        self._labels = []
+        self._label_codes = {}
+        self._size = 0
+        # Sizes before each append/extend, for undo
+        self._history = []
+        # Changes whenever the contents do, so it can key caches
+        self._id = uuid.uuid4().hex
+        self.version = 0
+        # Changes only on undo/clear, i.e. whenever rows are removed
+        self._edits = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def key(self):
+        return f"session:{self._id}:{self.version}"
+
+    # Stays the same while readings are only appended, so figures built from
+    # earlier rows can be extended instead of rebuilt
+    @property
+    def append_key(self):
+        return f"session:{self._id}:e{self._edits}"
+
+    def _reserve(self, n):
+        needed = self._size + n
+        if needed <= len(self._codes):
+            return
+        capacity = max(needed, 2 * len(self._codes))
+        self._L, self._C, self._H, self._codes = (
+            self._grow(self._L, capacity), self._grow(self._C, capacity),
+            self._grow(self._H, capacity), self._grow(self._codes, capacity))
+
+    def _grow(self, array, capacity):
+        grown = np.empty(capacity, dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _intern(self, label):
+        label = "" if label is None else str(label)
+        code = self._label_codes.get(label)
+        if code is None:
+            code = len(self._labels)
+            self._labels.append(label)
+            self._label_codes[label] = code
+        return code
+
+    def append(self, L, C, H, label=""):
+        self.extend([L], [C], [H], [label])
+
+    # Add many readings at once, e.g. from a pasted block
+    def extend(self, L, C, H, labels=None):
+        L = np.asarray(L, dtype=np.float64)
+        n = len(L)
+        if n == 0:
+            return
+        if labels is None:
+            labels = [""] * n
+        self._reserve(n)
+        end = self._size + n
+        self._L[self._size:end] = L
+        self._C[self._size:end] = C
+        self._H[self._size:end] = H
+        self._codes[self._size:end] = [self._intern(label) for label in labels]
+        self._history.append(self._size)
+        self._size = end
+        self.version += 1
+
+    # Remove the most recent append or extend
+    def undo(self):
+        if not self._history:
+            return
+        self._size = self._history.pop()
+        self.version += 1
+        self._edits += 1
+
+    def clear(self):
+        self._size = 0
+        self._history.clear()
+        self.version += 1
+        self._edits += 1
+
+    # Views onto the filled part of the L, C and H arrays
+    def arrays(self):
+        return self._L[:self._size], self._C[:self._size], self._H[:self._size]
+
+    # DataFrame over the stored readings; the numeric columns share memory with
+    # the store, and Toner is categorical over the interned labels
+    def frame(self):
+        if self._size == 0:
+            return pd.DataFrame()
+        L, C, H = self.arrays()
+        toner = pd.Categorical.from_codes(self._codes[:self._size], categories=self._labels)
+        return pd.DataFrame({'L': L, 'C': C, 'H': H, 'Toner': toner}, copy=False)
@@ -0,0 +1,22 @@
+import numpy as np
+
+import gamut
+
+
+def test_table_boundary_agrees_with_exact_check():
+    rng = np.random.default_rng(0)
+    L, H = rng.uniform(5, 95, 2_000), rng.uniform(0, 360, 2_000)
+    limit = gamut.max_chroma(L, H)
+    # Just inside and just outside the interpolated boundary
+    assert gamut._in_srgb(L, limit * 0.97, H).all()
+    assert not gamut._in_srgb(L, limit * 1.03 + 0.5, H).any()
+
+
+def test_blank_values_are_not_in_gamut():
+    L = np.array([50.0, np.nan, 50.0, 60.0, np.inf])
+    C = np.array([5.0, 5.0, 5.0, np.nan, 5.0])
+    H = np.array([120.0, 120.0, np.nan, 120.0, 120.0])
+    limit = gamut.max_chroma(L, H)
+    assert np.isfinite(limit[[0, 3]]).all()
+    assert np.isnan(limit[[1, 2, 4]]).all()
+    assert gamut.in_gamut(L, C, H).tolist() == [True, False, False, False, False]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from scipy import stats as scipy_stats
+
+import groups
+import lch_convert as lc
+
+
+def _readings(seed=0):
+    rng = np.random.default_rng(seed)
+    n = 3_000
+    source = rng.choice(["Press A", "Press B", "Proof"], n).astype(object)
+    source[:10] = None
+    # Hues straddle 0/360 so a naive mean would be far off
+    df = pd.DataFrame({'L': rng.normal(55, 4, n), 'C': rng.uniform(10, 60, n),
+                       'H': rng.normal(0, 15, n) % 360, 'Source': source})
+    return df
+
+
+def test_group_stats_match_per_group_reference():
+    df = _readings()
+    stats = groups.group_stats(df, "Source")
+    assert stats['count'].sum() == len(df)
+
+    keys = df['Source'].fillna("<missing>")
+    for _, row in stats.iterrows():
+        key = "<missing>" if pd.isna(row['Source']) else row['Source']
+        part = df[keys == key]
+        h = np.deg2rad(part['H'].to_numpy())
+        assert row['count'] == len(part)
+        np.testing.assert_allclose(row['L'], part['L'].mean())
+        np.testing.assert_allclose(row['L std'], part['L'].std(ddof=0))
+        np.testing.assert_allclose(row['C std'], part['C'].std(ddof=0))
+        np.testing.assert_allclose(np.deg2rad(row['H']), scipy_stats.circmean(h), atol=1e-9)
+        np.testing.assert_allclose(np.deg2rad(row['H spread']), scipy_stats.circstd(h), atol=1e-9)
+
+        lab = lc.lch_to_lab_array(part['L'].to_numpy(), part['C'].to_numpy(), part['H'].to_numpy())
+        np.testing.assert_allclose([row['a'], row['b']], lab[:, 1:].mean(axis=0))
+        eigenvalues = np.linalg.eigvalsh(np.cov(lab[:, 1:].T, bias=True))
+        np.testing.assert_allclose([row['ellipse minor'], row['ellipse major']], np.sqrt(eigenvalues),
+                                   atol=1e-9)
+
+
+def test_ellipse_outlines_sit_at_sigma_from_centroid():
+    stats = groups.group_stats(_readings(), "Source")
+    C, H = groups.ellipse_outlines(stats, sigma=2.0, points=16)
+    assert len(C) == len(stats) * 17
+    assert np.isnan(C[16::17]).all()
+
+    outline = np.column_stack([C, H]).reshape(len(stats), 17, 2)[:, :-1]
+    a = outline[..., 0] * np.cos(np.deg2rad(outline[..., 1])) - stats['a'].to_numpy()[:, None]
+    b = outline[..., 0] * np.sin(np.deg2rad(outline[..., 1])) - stats['b'].to_numpy()[:, None]
+    # Every outline point lies on the ellipse's 2 sigma contour
+    theta = np.deg2rad(stats['ellipse angle'].to_numpy())[:, None]
+    u = a * np.cos(theta) + b * np.sin(theta)
+    v = -a * np.sin(theta) + b * np.cos(theta)
+    major = 2.0 * stats['ellipse major'].to_numpy()[:, None]
+    minor = 2.0 * stats['ellipse minor'].to_numpy()[:, None]
+    np.testing.assert_allclose((u / major) ** 2 + (v / minor) ** 2, 1.0, atol=1e-9)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import lch_convert as lc
+import plot_3d as lcm
+
+# Parity of the batched conversions with the original point-by-point code,
+# which is kept here as the reference.
+
+
+def _lch_to_lab(L, C, H):
+    H_rad = np.deg2rad(H)
+    return np.array([L, np.cos(H_rad) * C, np.sin(H_rad) * C])
+
+
+def _lab_to_xyz(L, a, b):
+    Y = (L + 16) / 116
+    X = a / 500 + Y
+    Z = Y - b / 200
+    X = 95.047 * ((X ** 3) if (X ** 3 > 0.008856) else ((X - 16 / 116) / 7.787))
+    Y = 100.000 * ((Y ** 3) if (Y ** 3 > 0.008856) else ((Y - 16 / 116) / 7.787))
+    Z = 108.883 * ((Z ** 3) if (Z ** 3 > 0.008856) else ((Z - 16 / 116) / 7.787))
+    return np.array([X, Y, Z])
+
+
+def _xyz_to_rgb(X, Y, Z):
+    X, Y, Z = X / 100, Y / 100, Z / 100
+    R = X * 3.2406 + Y * -1.5372 + Z * -0.4986
+    G = X * -0.9689 + Y * 1.8758 + Z * 0.0415
+    B = X * 0.0557 + Y * -0.2040 + Z * 1.0570
+    R = 1 if R > 1 else 0 if R < 0 else R
+    G = 1 if G > 1 else 0 if G < 0 else G
+    B = 1 if B > 1 else 0 if B < 0 else B
+    return np.array([R, G, B])
+
+
+def _reference_colours(L_values, C_values, H_values):
+    return np.array([_xyz_to_rgb(*_lab_to_xyz(*_lch_to_lab(L, C, H)))
+                     for L, C, H in zip(L_values, C_values, H_values)])
+
+
+@pytest.fixture
+def lch():
+    rng = np.random.default_rng(1)
+    n = 5_000
+    L, C, H = rng.uniform(0, 100, n), rng.uniform(0, 130, n), rng.uniform(0, 360, n)
+    # Include the hue wrap, the achromatic axis and the ends of the L range
+    edges = np.array([[0, 0, 0], [100, 0, 0], [50, 0, 359.999], [50, 130, 360], [8, 20, 180]])
+    return (np.concatenate([L, edges[:, 0]]), np.concatenate([C, edges[:, 1]]),
+            np.concatenate([H, edges[:, 2]]))
+
+
+def test_plot_lch_colors_matches_original_loop(lch):
+    points, colours = lcm.plot_lch_colors(*lch)
+    np.testing.assert_allclose(colours, _reference_colours(*lch), atol=1e-12)
+    np.testing.assert_array_equal(points, np.column_stack(lch))
+
+
+def test_channels_and_n_by_3_inputs_agree(lch):
+    stacked = np.column_stack(lch)
+    np.testing.assert_array_equal(lc.lch_to_rgb_array(stacked), lc.lch_to_rgb_array(*lch))
+    np.testing.assert_array_equal(lc.lch_to_lab_array(stacked), lc.lch_to_lab_array(*lch))
+    lab = lc.lch_to_lab_array(stacked)
+    np.testing.assert_array_equal(lc.lab_to_xyz_array(lab), lc.lab_to_xyz_array(*lab.T))
+
+
+def test_scalar_wrappers_match_original(lch):
+    for L, C, H in list(zip(*lch))[::250]:
+        lab = lcm.lch_to_lab(L, C, H)
+        np.testing.assert_allclose(lab, _lch_to_lab(L, C, H), atol=1e-12)
+        xyz = lcm.lab_to_xyz(*lab)
+        np.testing.assert_allclose(xyz, _lab_to_xyz(*lab), atol=1e-12)
+        np.testing.assert_allclose(lcm.xyz_to_rgb(*xyz), _xyz_to_rgb(*xyz), atol=1e-12)
+
+
+def test_lab_to_lch_round_trip(lch):
+    lab = lc.lch_to_lab_array(*lch)
+    back = lc.lab_to_lch_array(lab)
+    np.testing.assert_allclose(back[:, :2], np.column_stack(lch[:2]), atol=1e-9)
+    # Hue is only defined away from the achromatic axis, and 360 comes back as 0
+    chromatic = lch[1] > 1e-9
+    dH = (back[chromatic, 2] - lch[2][chromatic] + 180) % 360 - 180
+    np.testing.assert_allclose(dH, 0, atol=1e-9)
@@ -0,0 +1,112 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import library
+
+
+def _readings(toners, sources=None, start=0):
+    n = len(toners)
+    frame = pd.DataFrame({'L': np.arange(start, start + n, dtype=np.float64),
+                          'C': np.full(n, 10.0), 'H': np.linspace(0, 350, n), 'Toner': toners})
+    if sources is not None:
+        frame['Source'] = sources
+    return frame
+
+
+@pytest.fixture
+def lib(tmp_path):
+    toners = ["Cyan 1", "Magenta 1", "Cyan Light 2", "Yellow", "Cyan 1", "Black"]
+    sources = ["Press A", "Press B", "Proof", "Press A", None, "Press A"]
+    return library.ColourLibrary.open(str(tmp_path / "lib"), create=True).append(_readings(toners, sources))
+
+
+def test_select_by_prefix(lib):
+    np.testing.assert_array_equal(lib.select(Toner="Cyan"), [0, 2, 4])
+    np.testing.assert_array_equal(lib.select(Toner="Cyan L"), [2])
+    np.testing.assert_array_equal(lib.select(Toner="Cyan", Source="Press"), [0])
+    np.testing.assert_array_equal(lib.select(Source="Press A"), [0, 3, 5])
+    assert len(lib.select(Toner="Zinc")) == 0
+    assert len(lib.select()) == len(lib) == 6
+
+    frame = lib.frame(lib.select(Toner="Cyan"))
+    assert frame['L'].tolist() == [0, 2, 4]
+    assert frame['Toner'].astype(str).tolist() == ["Cyan 1", "Cyan Light 2", "Cyan 1"]
+    assert frame['Source'].astype(str).tolist() == ["Press A", "Proof", ""]
+    np.testing.assert_allclose(np.hypot(frame['a'], frame['b']), frame['C'])
+
+
+def test_appends_keep_rows_and_names(lib):
+    lib = lib.append(_readings(["Cyan 1", "Cyan 3"], start=6))
+    assert len(lib) == 8
+    np.testing.assert_array_equal(lib.select(Toner="Cyan"), [0, 2, 4, 6, 7])
+    # Readings without a Source column get an empty one
+    np.testing.assert_array_equal(lib.select(Source="Press"), [0, 1, 3, 5])
+    assert library.ColourLibrary(lib.path).names('Toner').count("Cyan 1") == 1
+
+
+def test_library_opened_before_an_append_keeps_its_view(lib):
+    before = library.ColourLibrary(lib.path)
+    lib.append(_readings(["Cyan 0", "Magenta 0", "Aqua"], start=6))
+
+    np.testing.assert_array_equal(before.select(Toner="Cyan"), [0, 2, 4])
+    np.testing.assert_array_equal(before.select(Toner="M"), [1])
+    assert before.frame(before.select(Toner="Cyan"))['Toner'].astype(str).tolist() == \
+        ["Cyan 1", "Cyan Light 2", "Cyan 1"]
+
+    after = library.ColourLibrary(lib.path)
+    np.testing.assert_array_equal(after.select(Toner="Cyan"), [0, 2, 4, 6])
+    np.testing.assert_array_equal(after.select(Toner="A"), [8])
+
+
+def test_interrupted_append_is_ignored_then_overwritten(lib):
+    # Bytes and a cut-off name written past the committed rows, as a crash
+    # part way through an append would leave them
+    with open(lib._file("L.f64"), "ab") as f:
+        f.write(b"\x00" * 13)
+    with open(lib._file("Toner.codes"), "ab") as f:
+        f.write(b"\x01\x00\x00\x00")
+    with open(lib._file("Toner.names"), "ab") as f:
+        f.write(b'"Half wri')
+
+    reopened = library.ColourLibrary(lib.path)
+    assert len(reopened) == 6
+    np.testing.assert_array_equal(reopened.select(Toner="Cyan"), [0, 2, 4])
+
+    appended = reopened.append(_readings(["Half written"], start=6))
+    assert len(appended) == 7
+    assert appended.column('L').tolist() == list(range(7))
+    np.testing.assert_array_equal(appended.select(Toner="Half"), [6])
+    assert appended.names('Toner')[-1] == "Half written"
+
+
+def test_concurrent_appends_are_all_kept(lib):
+    def append(i):
+        target = library.ColourLibrary(lib.path)
+        for k in range(5):
+            target = target.append(_readings([f"T{i}"] * 10, start=1000 * i + 10 * k))
+
+    threads = [threading.Thread(target=append, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    final = library.ColourLibrary(lib.path)
+    assert len(final) == 6 + 4 * 5 * 10
+    frame = final.frame()
+    for i in range(4):
+        rows = final.select(Toner=f"T{i}")
+        assert len(rows) == 50
+        assert sorted(frame['L'].to_numpy()[rows] // 1000) == [i] * 50
+    assert not os.path.exists(os.path.join(lib.path, "append.lock"))
+
+
+def test_open_requires_a_library(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        library.ColourLibrary(str(tmp_path / "missing"))
+    with pytest.raises(ValueError):
+        library.ColourLibrary.open(str(tmp_path / "lib"), create=True).append(pd.DataFrame({'x': [1]}))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+import lod
+
+
+def _readings(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'L': rng.uniform(0, 100, n), 'C': rng.uniform(0, 80, n),
+                         'H': rng.uniform(0, 360, n), 'Toner': rng.choice(["Cyan", "Magenta"], n)})
+
+
+def test_counts_cover_every_reading():
+    df = _readings()
+    assert lod.polar_histogram(df, 10, 30)['count'].sum() == len(df)
+    assert lod.voxel_density(df, 10, 10, 30)['count'].sum() == len(df)
+    binned = lod.bin_polar(df, 10, 30, by="Toner")
+    assert binned['count'].sum() == len(df)
+    assert len(binned) == 2 * 8 * 12
+
+
+def test_readings_with_blank_values_are_left_out():
+    df = _readings()
+    blank = df.copy()
+    blank.loc[[0, 5], 'C'] = np.nan
+    blank.loc[9, 'H'] = np.nan
+    blank.loc[12, 'L'] = np.inf
+    kept = df.drop(index=[0, 5, 9, 12])
+
+    pd.testing.assert_frame_equal(lod.voxel_density(blank), lod.voxel_density(kept))
+    pd.testing.assert_frame_equal(lod.bin_polar(blank, by="Toner"), lod.bin_polar(kept, by="Toner"))
+    # The polar histogram doesn't use L, so only the rows missing C or H go
+    hist = lod.polar_histogram(blank)
+    assert hist['count'].sum() == len(df) - 3
+    assert (hist[['C0', 'H0']] >= 0).all().all()
+
+
+def test_payload_cost_separates_points_from_groups():
+    df = _readings(20_000)
+    df['Toner'] = [f"T{i % 500}" for i in range(len(df))]
+
+    def measure(sample):
+        return 1_000 + 60 * len(sample) + 500 * sample['Toner'].nunique()
+
+    per_point, per_group, fixed = lod.payload_cost(df, measure, by="Toner")
+    np.testing.assert_allclose([per_point, per_group, fixed], [60, 500, 1_000])
+    # Without groups the same chart is one trace
+    np.testing.assert_allclose(lod.payload_cost(df, lambda s: 1_000 + 60 * len(s)), [60, 0, 1_000])
+
+
+def test_bin_to_budget_coarsens_one_axis_at_a_time():
+    df = _readings(50_000)
+    binned, (c_step, h_step) = lod.bin_to_budget(df, 2_000, by="Toner")
+    assert len(binned) <= 2_000
+    assert binned['count'].sum() == len(df)
+    # The grid one step finer would not have fit
+    finer = (c_step / 2, h_step) if c_step * 360 / 80 > h_step else (c_step, h_step / 2)
+    assert len(lod.bin_polar(df, *finer, by="Toner")) > 2_000
+    assert 0.5 <= (80 / c_step) / (360 / h_step) <= 2
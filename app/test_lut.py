@@ -0,0 +1,32 @@
+import numpy as np
+
+import lch_convert as lc
+import lut
+
+# A coarse table keeps the test quick; interpolation error grows with the step
+SHAPE = (21, 27, 73)
+
+
+def test_lookup_is_close_to_exact_conversion():
+    table = lut.build_lut(SHAPE)
+    rng = np.random.default_rng(0)
+    L, C, H = rng.uniform(0, 100, 5_000), rng.uniform(0, 60, 5_000), rng.uniform(0, 360, 5_000)
+    diff = np.abs(lut.lch_to_rgb_lut(L, C, H, table=table) - lc.lch_to_rgb_array(L, C, H))
+    assert diff.mean() < 0.01
+
+
+def test_blank_values_give_nan_colours():
+    table = lut.build_lut(SHAPE)
+    lch = np.array([[50, 10, 5], [np.nan, 10, 5], [60, np.inf, 5], [60, 10, np.nan]], dtype=np.float64)
+    rgb = lut.lch_to_rgb_lut(lch, table=table)
+    assert np.isfinite(rgb[0]).all()
+    assert np.isnan(rgb[1:]).all()
+
+
+def test_saved_table_is_reloaded(tmp_path):
+    path = str(tmp_path / "lut.npy")
+    table = lut.load_lut(path, SHAPE)
+    assert table.shape == (*SHAPE, 3)
+    assert [name for name in tmp_path.iterdir() if name.suffix == ".tmp"] == []
+    lut._tables.clear()
+    np.testing.assert_array_equal(lut.load_lut(path, SHAPE), table)
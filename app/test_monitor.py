@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import delta_e
+import lch_convert as lc
+import monitor
+
+
+def _readings(n=600, toners=4, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, toners, n).astype(np.int32)
+    lab = np.column_stack([rng.normal(50, 5, n), rng.normal(20, 5, n), rng.normal(-10, 5, n)])
+    return codes, lab
+
+
+def _expected(codes, lab, alpha, baseline_readings):
+    frame = pd.DataFrame(lab, columns=['L', 'a', 'b'])
+    frame['code'] = codes
+    rolling = frame.groupby('code')[['L', 'a', 'b']].transform(
+        lambda s: s.ewm(alpha=alpha, adjust=True).mean())
+    last = frame.assign(**rolling).groupby('code')[['L', 'a', 'b']].last()
+    baseline = frame.groupby('code')[['L', 'a', 'b']].agg(lambda s: s.head(baseline_readings).mean())
+    return last.to_numpy(), baseline.to_numpy()
+
+
+def test_drift_stats_match_pandas_ewm_in_any_chunking():
+    codes, lab = _readings()
+    rolling, baseline = _expected(codes, lab, 0.05, 20)
+    for cuts in ([], [1, 2, 3, 250], list(range(7, 600, 37))):
+        stats = monitor.DriftStats(alpha=0.05, baseline_readings=20)
+        for part_codes, part_lab in zip(np.split(codes, cuts), np.split(lab, cuts)):
+            stats.update(part_codes, part_lab)
+        table = stats.table(["T0", "T1", "T2", "T3"])
+        np.testing.assert_allclose(table[['L', 'C', 'H']].to_numpy(), lc.lab_to_lch_array(rolling))
+        np.testing.assert_allclose(table['Drift dE CIEDE2000'], delta_e.ciede2000(baseline, rolling))
+        assert table['Readings'].tolist() == np.bincount(codes).tolist()
+
+
+def test_ring_buffer_keeps_latest_in_order():
+    buffer = monitor.RingBuffer(capacity=5)
+    for start in (0, 3, 6):
+        values = np.arange(start, start + 3, dtype=np.float64)
+        buffer.extend(values, values, values, values.astype(np.int32))
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(buffer.arrays()[0], [4, 5, 6, 7, 8])
+    big = np.arange(100, 112, dtype=np.float64)
+    buffer.extend(big, big, big, big.astype(np.int32))
+    np.testing.assert_array_equal(buffer.arrays()[0], big[-5:])
+
+
+def test_csv_tail_waits_for_whole_lines(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_bytes(b"L,C,H,Toner\n50,10,20,C1\n60,5,")
+    feed = monitor.CsvTail(str(path))
+    mon = monitor.Monitor(feed, capacity=100)
+    assert mon.poll() == 1
+    with open(path, "ab") as f:
+        f.write(b"90,M1\n70,1,2,C1\n")
+    assert mon.poll() == 2
+    assert mon.poll() == 0
+    frame = mon.frame()
+    assert frame['L'].tolist() == [50, 60, 70]
+    assert frame['Toner'].astype(str).tolist() == ["C1", "M1", "C1"]
+
+    # A file that shrinks has been replaced and is read again from the top
+    path.write_bytes(b"L,C,H,Toner\n40,1,1,K1\n")
+    assert mon.poll() == 1
+    assert mon.frame()['L'].tolist()[-1] == 40
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+import delta_e
+import neighbours
+
+
+def _readings(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(0, 100, n), rng.uniform(-80, 80, (n, 2))])
+
+
+def test_cie76_query_is_exact():
+    lab = _readings()
+    index = neighbours.ColourIndex(lab)
+    target = np.array([55.0, 12.0, -30.0])
+    idx, dist = index.query(target, k=10, metric="CIE76")
+    expected = np.sort(delta_e.cie76(target, lab))[:10]
+    np.testing.assert_allclose(dist, expected)
+    np.testing.assert_allclose(delta_e.cie76(target, lab[idx]), dist)
+
+
+def test_ciede2000_query_matches_brute_force():
+    lab = _readings()
+    index = neighbours.ColourIndex(lab)
+    for target in ([50.0, 0.0, 0.0], [70.0, 40.0, 60.0], [20.0, -10.0, -50.0]):
+        idx, dist = index.query(target, k=5, metric="CIEDE2000")
+        expected = np.sort(delta_e.ciede2000(np.array(target), lab))[:5]
+        np.testing.assert_allclose(dist, expected)
+
+
+def test_nearest_colours_from_lch_frame():
+    lab = _readings(200)
+    lch = pd.DataFrame({'L': lab[:, 0], 'C': np.hypot(lab[:, 1], lab[:, 2]),
+                        'H': np.degrees(np.arctan2(lab[:, 2], lab[:, 1])) % 360})
+    result = neighbours.nearest_colours(lch, lab[17], k=3)
+    assert list(result.columns) == ['dE CIE76', 'L', 'C', 'H']
+    assert result['dE CIE76'].iloc[0] < 1e-9
+    assert result['L'].iloc[0] == lch['L'].iloc[17]
+
+
+def test_readings_with_blank_values_are_skipped():
+    lab = _readings(500)
+    lab[[3, 40, 41]] = np.nan
+    lab[7, 1] = np.inf
+    index = neighbours.ColourIndex(lab)
+    assert len(index) == 496
+    for metric in ("CIE76", "CIEDE2000"):
+        idx, dist = index.query(lab[100], k=3, metric=metric)
+        assert idx[0] == 100 and dist[0] < 1e-9
+        assert not {3, 7, 40, 41} & set(idx)
+        np.testing.assert_allclose(delta_e.METRICS[metric](lab[100], lab[idx]), dist)
@@ -0,0 +1,87 @@
+import base64
+import functools
+import io
+import os
+import uuid
+
+import numpy as np
+
+import lch_convert as lc
+
+# Hue-wheel background for the polar chart, drawn from the same LCH -> sRGB
+# maths as the markers. Each (size, L, opacity bucket) is rendered once, kept in
+# memory and on disk, and handed to Plotly as a ready-made PNG data URI, so
+# redraws neither read a file nor fetch one over the network.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".wheel_cache")
+DEFAULT_SIZE = 600
+DEFAULT_L = 65.0
+MAX_C = 130.0
+# Matches start_angle in the polar charts: hue 0 sits 23 degrees below due east
+ROTATION = -23.0
+OPACITY_STEPS = 20
+
+# Layout image that lines the wheel up with a polar chart using range_r=[0, MAX_C]
+LAYOUT_IMAGE = dict(xref="paper", yref="paper", x=0.5, y=0.5, sizex=1.0, sizey=1.0,
+                    xanchor="center", yanchor="middle", sizing="contain", layer="below")
+
+
+def opacity_bucket(opacity):
+    return round(float(opacity) * OPACITY_STEPS) / OPACITY_STEPS
+
+
+# RGBA pixels of the wheel at lightness L; outside the circle is transparent
+def render_wheel(size=DEFAULT_SIZE, L=DEFAULT_L, opacity=1.0):
+    centre = (size - 1) / 2
+    y, x = np.mgrid[0:size, 0:size]
+    dx = x - centre
+    dy = centre - y
+    C = np.hypot(dx, dy) / (size / 2) * MAX_C
+    H = (np.degrees(np.arctan2(dy, dx)) - ROTATION) % 360
+
+    rgb = lc.lch_to_rgb_array(np.full(C.shape, L), C, H)
+    alpha = np.where(C <= MAX_C, opacity, 0.0)
+    rgba = np.dstack([rgb, alpha])
+    return (rgba * 255 + 0.5).astype(np.uint8)
+
+
+def _png_bytes(size, L, opacity):
+    path = os.path.join(CACHE_DIR, f"wheel_{size}_L{L:g}_a{opacity:g}.png")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    # PIL is only needed when a wheel is not already on disk
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(render_wheel(size, L, opacity), mode="RGBA").save(buffer, format="PNG", optimize=True)
+    data = buffer.getvalue()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Written under a unique name and moved into place, so another session
+        # never reads a half-written PNG
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        # A read-only install still works, just without the disk cache
+        pass
+    return data
+
+
+@functools.lru_cache(maxsize=64)
+def _data_uri(size, L, opacity):
+    return "data:image/png;base64," + base64.b64encode(_png_bytes(size, L, opacity)).decode("ascii")
+
+
+# PNG data URI of the wheel, with L rounded to whole units and opacity to the
+# nearest bucket so nearby slider values share a render
+def wheel_data_uri(size=DEFAULT_SIZE, L=DEFAULT_L, opacity=1.0):
+    return _data_uri(int(size), float(round(L)), opacity_bucket(opacity))
+
+
+# Layout image dict for fig.update_layout(images=[...])
+def wheel_image(size=DEFAULT_SIZE, L=DEFAULT_L, opacity=1.0):
+    return dict(LAYOUT_IMAGE, source=wheel_data_uri(size, L, opacity))
@@ -0,0 +1,133 @@
+import concurrent.futures
+import threading
+import weakref
+
+import pandas as pd
+
+import ingest
+import instrument
+
+# Background conversion of uploads. A job takes an iterator of (chunk,
+# fraction done) pairs, e.g. from ingest.iter_colour_file, and consumes it on a
+# worker thread, so the Streamlit script only checks on it: the sidebar stays
+# live, the readings converted so far can be drawn straight away, and a job
+# nobody wants any more stops at its next chunk. Sessions converting the same
+# data share one job.
+
+MAX_WORKERS = 2
+
+
+class ConversionJob:
+
+    def __init__(self, key, chunks):
+        self.key = key
+        self._chunks = chunks
+        self._parts = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._first = threading.Event()
+        self._done = threading.Event()
+        self._frame = (0, None)
+        self.progress = 0.0
+        self.rows = 0
+        self.error = None
+        self.future = None
+        self.started = False
+        # Stage timings and counters from the worker thread, summed over the
+        # chunks, for the diagnostics of whichever run sees the job finish
+        self.timings = ([], {})
+        self.users = 0
+
+    def run(self):
+        self.started = True
+        instrument.start()
+        try:
+            for chunk, fraction in self._chunks:
+                if self._cancel.is_set():
+                    return
+                with self._lock:
+                    self._parts.append(chunk)
+                    self.rows += len(chunk)
+                    self.progress = fraction
+                # Held back until a second chunk arrives, so a file that fits in
+                # one chunk is simply done rather than drawn twice
+                if len(self._parts) > 1:
+                    self._first.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._chunks = None
+            records, counters = instrument.stop(log=False)
+            totals = {}
+            for stage, seconds in records:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+            self.timings = (list(totals.items()), counters)
+            self._done.set()
+            self._first.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self._done.set()
+            self._first.set()
+
+    # Block until there are chunks to draw (or the job has ended)
+    def wait_first(self, timeout=None):
+        return self._first.wait(timeout)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    # The readings converted so far, or all of them once the job is done
+    def frame(self):
+        with self._lock:
+            parts = list(self._parts)
+        n, frame = self._frame
+        if n != len(parts):
+            frame = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+            self._frame = (len(parts), frame)
+        return frame if frame is not None else pd.DataFrame(columns=ingest.LCH_COLUMNS)
+
+
+class ConversionWorkers:
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix="conversion")
+        # Held weakly: a job lives as long as a session or the pool needs it
+        self._jobs = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    # The job converting the data for key, joining one another session has
+    # already started if there is one. make_chunks is only called for a new job.
+    # Every acquire is matched by a release.
+    def acquire(self, key, make_chunks):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.cancelled or job.error is not None:
+                job = ConversionJob(key, make_chunks())
+                job.future = self._executor.submit(job.run)
+                self._jobs[key] = job
+            job.users += 1
+        return job
+
+    # Drop a session's interest in a job; the last one out cancels it
+    def release(self, job):
+        with self._lock:
+            job.users -= 1
+            if job.users > 0:
+                return
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+        job.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)